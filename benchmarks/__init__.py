@@ -0,0 +1,3 @@
+"""
+gnome-extensions-cli benchmarks
+"""
@@ -0,0 +1,213 @@
+"""
+gnome-extensions-cli
+
+Time gext commands end to end against synthetic extension trees and a local
+fake store, results are appended to a history file and compared with previous runs
+"""
+
+import json
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional
+
+from tests.helpers import Desktop, FakeStore, extension_uuid, run_gext
+
+ROOT = Path(__file__).resolve().parent.parent
+# extensions available on the store but not installed
+EXTRA = 5
+
+
+def scenarios(size: int) -> Dict[str, List[str]]:
+    """
+    Commands to benchmark, installed extensions are 0 to size-1
+    """
+    return {
+        "list": ["list", "--all"],
+        "search": ["search", "--online", "--limit", "50", "bench", "extension"],
+        "show": ["show", "--online"] + [extension_uuid(i) for i in range(5)],
+        "install": ["install"] + [extension_uuid(size + i) for i in range(EXTRA)],
+        "update": ["update", "--yes"],
+    }
+
+
+def run_command(
+    args: List[str], size: int, store: FakeStore, installed: Dict[int, int]
+) -> float:
+    """
+    Run a gext command on a fresh desktop, return its duration
+    """
+    with TemporaryDirectory(prefix="gext-bench-") as tmp:
+        desktop = Desktop(Path(tmp))
+        desktop.populate(size, installed)
+        start = time.perf_counter()
+        process = run_gext(args, desktop, store)
+        elapsed = time.perf_counter() - start
+        assert process.returncode == 0, (
+            f"gext {' '.join(args)} failed:\n{process.stderr}"
+        )
+        return elapsed
+
+
+def revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: Path) -> List[Dict]:
+    try:
+        return [json.loads(line) for line in path.read_text().splitlines() if line]
+    except OSError:
+        return []
+
+
+def baseline(
+    history: List[Dict], record: Dict, command: str, count: int
+) -> Optional[float]:
+    """
+    Median of the last comparable runs of a command
+    """
+    values = [
+        old["timings"][command]
+        for old in history
+        if old["size"] == record["size"]
+        and old["latency"] == record["latency"]
+        and command in old["timings"]
+    ][-count:]
+    return median(values) if len(values) > 0 else None
+
+
+def main(args: Namespace) -> int:
+    history = load_history(args.history)
+    regressions = []
+    records = []
+    print(f"{'command':>10} {'size':>6} {'time':>9} {'baseline':>9} {'delta':>8}")
+    for size in args.sizes:
+        installed = {index: 1 for index in range(size)}
+        # one extension out of ten is outdated, extra ones are not installed
+        available = {
+            index: 2 if index % 10 == 0 else 1 for index in range(size + EXTRA)
+        }
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": revision(),
+            "python": sys.version.split()[0],
+            "size": size,
+            "latency": args.latency,
+            "repeat": args.repeat,
+            "timings": {},
+        }
+        with FakeStore(available, latency=args.latency) as store:
+            for name, command in scenarios(size).items():
+                if args.commands and name not in args.commands:
+                    continue
+                elapsed = median(
+                    run_command(command, size, store, installed)
+                    for _ in range(args.repeat)
+                )
+                record["timings"][name] = elapsed
+                reference = baseline(history, record, name, args.baseline)
+                delta = ""
+                if reference is not None:
+                    delta = f"{(elapsed - reference) / reference:+.1%}"
+                    if (
+                        elapsed > reference * (1 + args.tolerance)
+                        and elapsed - reference > args.noise
+                    ):
+                        regressions.append((name, size))
+                        delta += " !"
+                print(
+                    f"{name:>10} {size:>6} {elapsed:>8.3f}s "
+                    + (f"{reference:>8.3f}s" if reference is not None else " " * 9)
+                    + f" {delta:>8}",
+                    flush=True,
+                )
+        records.append(record)
+
+    if args.save:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with args.history.open("a") as stream:
+            for record in records:
+                stream.write(json.dumps(record) + "\n")
+
+    if len(regressions) > 0:
+        print(
+            "Regressions:",
+            ", ".join(f"{name} ({size} extensions)" for name, size in regressions),
+        )
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="gext benchmarks")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000],
+        help="number of installed extensions (default: 100 1000)",
+    )
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        choices=list(scenarios(0)),
+        help="commands to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="latency of the fake store in seconds (default: 0.02)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per command (default: 3)"
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=ROOT / ".benchmarks" / "history.jsonl",
+        help="file where results are appended",
+    )
+    parser.add_argument(
+        "--no-save",
+        dest="save",
+        action="store_false",
+        help="do not append results to the history",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=int,
+        default=5,
+        help="number of previous runs used as baseline (default: 5)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slowdown reported as regression (default: 0.2)",
+    )
+    parser.add_argument(
+        "--noise",
+        type=float,
+        default=0.05,
+        help="absolute slowdown in seconds ignored (default: 0.05)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit with an error code when a regression is found",
+    )
+    sys.exit(main(parser.parse_args()))
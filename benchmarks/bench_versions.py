@@ -0,0 +1,89 @@
+"""
+gnome-extensions-cli
+
+Micro-benchmark of version comparisons when planning updates
+"""
+
+from argparse import Namespace
+from pathlib import Path
+from random import Random
+from timeit import timeit
+
+from packaging.version import Version
+
+from gnome_extensions_cli.commands.update import OUTDATED, get_status
+from gnome_extensions_cli.schema import AvailableExtension, InstalledExtension, Metadata
+from gnome_extensions_cli.state import StateSnapshot
+from gnome_extensions_cli.utils import parse_version
+
+COUNT = 5000
+REPEAT = 10
+
+
+def legacy_comparator(left, right) -> int:
+    # comparator without any cache, as before
+    if left == right:
+        return 0
+    if left is None:
+        return 1
+    if right is None:
+        return -1
+    vleft, vright = Version(str(left)), Version(str(right))
+    return 1 if vleft < vright else -1 if vleft > vright else 0
+
+
+def main():
+    rng = Random(42)
+    installed = {f"ext{i}@bench": rng.randint(1, 60) for i in range(COUNT)}
+    state = StateSnapshot(
+        [
+            InstalledExtension.from_metadata(
+                Path("/nonexistent") / uuid,
+                Metadata(uuid=uuid, name=uuid, version=version),
+            )
+            for uuid, version in installed.items()
+        ],
+        frozenset(installed),
+    )
+    available = [
+        AvailableExtension(
+            uuid=uuid,
+            pk=pk,
+            name=uuid,
+            description="",
+            creator="bench",
+            shell_version_map={},
+            version=version + rng.randint(0, 1),
+        )
+        for pk, (uuid, version) in enumerate(installed.items())
+    ]
+    args = Namespace(user=False)
+
+    def plan_legacy():
+        return [
+            ext.uuid
+            for ext in available
+            if legacy_comparator(
+                state.by_uuid[ext.uuid].extension.metadata.version, ext.version
+            )
+            > 0
+        ]
+
+    def plan_update():
+        # same comparison as the update command
+        return [
+            ext.uuid for ext in available if get_status(args, state, ext) == OUTDATED
+        ]
+
+    assert plan_legacy() == plan_update()
+    parse_version.cache_clear()
+    for name, func in (
+        ("uncached comparator", plan_legacy),
+        ("update get_status", plan_update),
+    ):
+        elapsed = timeit(func, number=REPEAT) / REPEAT
+        print(f"{name:>20}: {elapsed * 1000:8.2f} ms for {COUNT} extensions")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,13 @@
 gnome-extensions-cli
 """
 
-from importlib.metadata import version
 
-__version__ = version(__name__)
+def __getattr__(name: str):
+    # the version is resolved on demand, importlib.metadata is slow to import
+    if name == "__version__":
+        from importlib.metadata import (  # pylint: disable=import-outside-toplevel
+            version,
+        )
+
+        return version(__name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
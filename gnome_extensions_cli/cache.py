@@ -0,0 +1,287 @@
+"""
+gnome-extensions-cli
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from hashlib import sha1, sha256
+from os.path import expanduser
+from pathlib import Path
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from pydantic import BaseModel
+
+from .schema import InstalledExtension, Metadata, load_all
+
+
+def cache_folder() -> Path:
+    """
+    Return the folder used to store cached data
+    """
+    return (
+        Path(os.getenv("XDG_CACHE_HOME") or expanduser("~/.cache"))
+        / "gnome-extensions-cli"
+    )
+
+
+def evict_files(files: Iterable[Path], max_size: int):
+    """
+    Remove least recently used files until their total size fits in max_size
+    """
+    entries = []
+    total = 0
+    for path in files:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    for _mtime, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def file_digest(path: Path) -> str:
+    """
+    Compute the sha256 of a file
+    """
+    digest = sha256()
+    with path.open("rb") as stream:
+        for chunk in iter(lambda: stream.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CacheEntry(BaseModel):
+    timestamp: float
+    status: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body: Optional[str] = None
+
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Headers to use to revalidate the entry with a conditional request
+        """
+        out = {}
+        if self.etag is not None:
+            out["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            out["If-Modified-Since"] = self.last_modified
+        return out
+
+
+@dataclass
+class StoreCache:
+    """
+    Persistent cache for responses of the Gnome Website
+    """
+
+    folder: Path = field(default_factory=lambda: cache_folder() / "store")
+    ttl: int = 3600
+    negative_ttl: int = 86400
+    max_size: int = 16 * 1024 * 1024
+    # eviction scans the whole folder, only run it every few writes
+    evict_interval: int = 100
+    writes: int = field(init=False, default=0)
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{sha1(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Return the cached entry for the given key, fresh or not
+        """
+        path = self._path(key)
+        try:
+            entry = CacheEntry.model_validate_json(path.read_text())
+        except (OSError, ValueError):
+            return None
+        try:
+            # keep track of last usage for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        Check if the entry can be used without contacting the server
+        """
+        return entry.age() < (self.negative_ttl if entry.status == 404 else self.ttl)
+
+    def put(self, key: str, entry: CacheEntry):
+        """
+        Store an entry in the cache, failures are ignored since the cache is only
+        an optimization
+        """
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile(
+                "w", dir=self.folder, suffix=".tmp", delete=False
+            ) as tmp:
+                tmp.write(entry.model_dump_json())
+            os.replace(tmp.name, self._path(key))
+            self.writes += 1
+            if (self.writes - 1) % self.evict_interval == 0:
+                self.evict()
+        except OSError:
+            pass
+
+    def clear(self):
+        """
+        Remove all cached entries
+        """
+        for path in self.folder.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_size
+        """
+        evict_files(self.folder.glob("*.json"), self.max_size)
+
+
+@dataclass
+class ArchiveCache:
+    """
+    Content addressed cache of extension archives, stored as
+    <uuid>/v<version>-<sha256>.zip so it can also be seeded manually
+    """
+
+    folder: Path = field(default_factory=lambda: cache_folder() / "archives")
+    max_size: int = 256 * 1024 * 1024
+
+    def get(self, uuid: str, version: Union[str, int]) -> Optional[Path]:
+        """
+        Return the cached archive of the given extension version, if any
+        """
+        for path in (self.folder / uuid).glob(f"v{version}-*.zip"):
+            if file_digest(path) != path.stem.split("-", 1)[1]:
+                # corrupted archive
+                path.unlink(missing_ok=True)
+                continue
+            # keep track of last usage for eviction
+            os.utime(path)
+            return path
+        return None
+
+    def put(
+        self, uuid: str, version: Union[str, int], archive: Path, digest: str
+    ) -> Optional[Path]:
+        """
+        Store a copy of the given archive in the cache, return None if it could not
+        be stored or is larger than the cache
+        """
+        target = self.folder / uuid / f"v{version}-{digest}.zip"
+        try:
+            size = archive.stat().st_size
+            if size > self.max_size:
+                return None
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with archive.open("rb") as source, NamedTemporaryFile(
+                dir=target.parent, suffix=".tmp", delete=False
+            ) as tmp:
+                copyfileobj(source, tmp)
+            os.replace(tmp.name, target)
+            # keep the new archive, others are evicted to make room for it
+            evict_files(
+                (path for path in self.folder.glob("*/*.zip") if path != target),
+                self.max_size - size,
+            )
+        except OSError:
+            return None
+        return target
+
+    def evict(self):
+        """
+        Remove least recently used archives until the cache fits in max_size
+        """
+        evict_files(self.folder.glob("*/*.zip"), self.max_size)
+
+
+@dataclass
+class MetadataIndex:
+    """
+    Persistent index of installed extensions metadata, entries are keyed by the
+    metadata file path and invalidated when its mtime or size changes
+    """
+
+    path: Path = field(default_factory=lambda: cache_folder() / "installed.json")
+    entries: Dict[str, Dict[str, Any]] = field(init=False, default_factory=dict)
+    seen: Set[str] = field(init=False, default_factory=set)
+    dirty: bool = field(init=False, default=False)
+
+    def __post_init__(self):
+        try:
+            self.entries = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def load(
+        self, extensions: Iterable[InstalledExtension]
+    ) -> List[InstalledExtension]:
+        """
+        Load the metadata of given extensions, using the index for unchanged ones.
+        Extensions without metadata file are ignored
+        """
+        out = []
+        changed = []
+        for ext in extensions:
+            try:
+                stat = os.stat(ext.metadata_json)
+            except OSError:
+                continue
+            key = str(ext.metadata_json)
+            signature = [stat.st_mtime_ns, stat.st_size]
+            self.seen.add(key)
+            entry = self.entries.get(key)
+            try:
+                if entry is not None and entry.get("signature") == signature:
+                    ext = InstalledExtension.from_metadata(
+                        ext.folder, Metadata.model_validate(entry["metadata"])
+                    )
+                else:
+                    changed.append((ext, signature))
+            except (KeyError, ValueError):
+                changed.append((ext, signature))
+            out.append(ext)
+
+        load_all(ext for ext, _ in changed)
+        for ext, signature in changed:
+            self.entries[str(ext.metadata_json)] = {
+                "signature": signature,
+                "metadata": ext.metadata.model_dump(mode="json", by_alias=True),
+            }
+            self.dirty = True
+        return out
+
+    def save(self):
+        """
+        Write the index if it changed, dropping entries which were not used
+        """
+        for key in set(self.entries) - self.seen:
+            del self.entries[key]
+            self.dirty = True
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile(
+                "w", dir=self.path.parent, suffix=".tmp", delete=False
+            ) as tmp:
+                json.dump(self.entries, tmp)
+            os.replace(tmp.name, self.path)
+            self.dirty = False
+        except OSError:
+            pass
@@ -0,0 +1,217 @@
+"""
+gnome-extensions-cli
+"""
+
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from hashlib import sha1
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Union
+
+from .cache import cache_folder
+from .schema import AvailableExtension
+from .store import GnomeExtensionStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extensions (
+    pk INTEGER PRIMARY KEY,
+    uuid TEXT UNIQUE NOT NULL,
+    rank INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS extensions_fts USING fts5(
+    uuid, name, description, creator
+);
+CREATE TABLE IF NOT EXISTS properties (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# age after which the local catalog is considered out of date, in seconds
+MAX_AGE = 7 * 24 * 3600
+
+
+def select_shell_version(
+    ext: AvailableExtension, shell_version: Optional[str]
+) -> Optional[AvailableExtension]:
+    """
+    Resolve the recommended version of an extension for the given Gnome Shell
+    version, return None if no version is compatible
+    """
+    if shell_version is None:
+        return ext
+    parts = str(shell_version).split(".")
+    for candidate in (str(shell_version), ".".join(parts[:2]), parts[0]):
+        version = ext.shell_version_map.get(candidate)
+        if version is not None:
+            return ext.model_copy(
+                update={
+                    "version": version.version,
+                    "version_tag": version.pk,
+                    "download_url": f"/download-extension/{ext.uuid}.shell-extension.zip"
+                    + f"?version_tag={version.pk}",
+                }
+            )
+    return None
+
+
+@dataclass
+class ExtensionCatalog:
+    """
+    Local mirror of the Gnome Website catalog with full-text search
+    """
+
+    path: Path = field(default_factory=lambda: cache_folder() / "catalog.sqlite")
+
+    @cached_property
+    def connection(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        out = sqlite3.connect(str(self.path))
+        out.executescript(SCHEMA)
+        return out
+
+    def exists(self) -> bool:
+        """
+        Check if the catalog has already been synchronized
+        """
+        return self.path.is_file() and self.get_property("last_sync") is not None
+
+    def get_property(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT value FROM properties WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def age(self) -> Optional[float]:
+        """
+        Return the number of seconds since the last sync, None if never synchronized
+        """
+        last_sync = self.get_property("last_sync")
+        return time.time() - float(last_sync) if last_sync is not None else None
+
+    def is_stale(self, max_age: float = MAX_AGE) -> bool:
+        age = self.age()
+        return age is None or age > max_age
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM extensions").fetchone()[0]
+
+    def sync(
+        self, store: GnomeExtensionStore, page_size: Optional[int] = None
+    ) -> Tuple[int, int, int]:
+        """
+        Crawl the whole catalog from the store, only changed records are written.
+        Return the number of added, updated and removed extensions
+        """
+        known = dict(self.connection.execute("SELECT pk, digest FROM extensions"))
+        seen = set()
+        added, updated = 0, 0
+        with self.connection:
+            for rank, ext in enumerate(store.search("", page_size=page_size)):
+                data = ext.model_dump_json()
+                digest = sha1(data.encode()).hexdigest()
+                seen.add(ext.pk)
+                if known.get(ext.pk) == digest:
+                    self.connection.execute(
+                        "UPDATE extensions SET rank = ? WHERE pk = ?", (rank, ext.pk)
+                    )
+                    continue
+                if ext.pk in known:
+                    updated += 1
+                else:
+                    added += 1
+                self._delete(ext.pk)
+                for (pk,) in self.connection.execute(
+                    "SELECT pk FROM extensions WHERE uuid = ?", (ext.uuid,)
+                ).fetchall():
+                    # the uuid was previously published with another pk
+                    self._delete(pk)
+                self.connection.execute(
+                    "INSERT INTO extensions (pk, uuid, rank, digest, data) VALUES (?, ?, ?, ?, ?)",
+                    (ext.pk, ext.uuid, rank, digest, data),
+                )
+                self.connection.execute(
+                    "INSERT INTO extensions_fts (rowid, uuid, name, description, creator) VALUES (?, ?, ?, ?, ?)",
+                    (ext.pk, ext.uuid, ext.name, ext.description, ext.creator),
+                )
+            removed = set(known) - seen
+            for pk in removed:
+                self._delete(pk)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO properties (key, value) VALUES ('last_sync', ?)",
+                (str(time.time()),),
+            )
+        return added, updated, len(removed)
+
+    def _delete(self, pk: int):
+        self.connection.execute("DELETE FROM extensions WHERE pk = ?", (pk,))
+        self.connection.execute("DELETE FROM extensions_fts WHERE rowid = ?", (pk,))
+
+    def iter_fetch(
+        self,
+        extensions: Iterable[Union[str, int]],
+        shell_version: Optional[str] = None,
+    ) -> Iterable[Tuple[Union[str, int], Optional[AvailableExtension]]]:
+        """
+        Same as GnomeExtensionStore.iter_fetch using the local catalog
+        """
+        for ext in extensions:
+            yield (ext, self.find(ext, shell_version=shell_version))
+
+    def find(
+        self, ext: Union[str, int], shell_version: Optional[str] = None
+    ) -> Optional[AvailableExtension]:
+        """
+        Find an extension by its uuid or pk, with a version compatible with the given
+        Gnome Shell version if any
+        """
+        if isinstance(ext, int) or ext.isnumeric():
+            row = self.connection.execute(
+                "SELECT data FROM extensions WHERE pk = ?", (int(ext),)
+            ).fetchone()
+        else:
+            row = self.connection.execute(
+                "SELECT data FROM extensions WHERE uuid = ?", (ext,)
+            ).fetchone()
+        if row is None:
+            return None
+        return select_shell_version(
+            AvailableExtension.model_validate_json(row[0]), shell_version
+        )
+
+    def search(
+        self,
+        motif: str,
+        shell_version: str = "all",
+        limit: int = 0,
+        page_size: Optional[int] = None,  # pylint: disable=unused-argument
+    ) -> Iterable[AvailableExtension]:
+        """
+        Same as GnomeExtensionStore.search using the local full-text index
+        """
+        tokens = motif.split()
+        if len(tokens) == 0:
+            cursor = self.connection.execute(
+                "SELECT data FROM extensions ORDER BY rank"
+            )
+        else:
+            query = " ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+            cursor = self.connection.execute(
+                "SELECT e.data FROM extensions_fts f JOIN extensions e ON e.pk = f.rowid "
+                + "WHERE extensions_fts MATCH ? ORDER BY f.rank, e.rank",
+                (query,),
+            )
+        found = 0
+        for (data,) in cursor:
+            ext = AvailableExtension.model_validate_json(data)
+            if shell_version != "all" and ext.shell_version_map.get(
+                shell_version
+            ) is None:
+                continue
+            yield ext
+            found += 1
+            if 0 < limit <= found:
+                return
@@ -3,39 +3,96 @@ gnome-extensions-cli
 """
 
 import sys
-from argparse import ArgumentParser
+from argparse import SUPPRESS, Action, ArgumentParser, Namespace
+from importlib import import_module
 from os import getenv
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-from colorama import init
+if TYPE_CHECKING:
+    from .daemon import Resident
+    from .timings import Recorder
 
-from . import __version__
-from .commands import (
-    disable,
-    enable,
-    install,
-    list_,
-    preferences,
-    search,
-    show,
-    uninstall,
-    update,
-)
-from .dbus import DbusExtensionManager, test_dbus_available
-from .filesystem import FilesystemExtensionManager
-from .icons import Color, Icons
-from .store import GnomeExtensionStore
+# subcommand name: (module in commands package, aliases, help), command modules
+# and their dependencies are only imported when the subcommand is used
+COMMANDS: Dict[str, Tuple[str, List[str], str]] = {
+    "list": ("list_", ["ls"], "list installed extensions"),
+    "search": ("search", [], "search for extensions"),
+    "show": ("show", [], "show extensions details"),
+    "catalog": ("catalog", [], "manage the local catalog of extensions"),
+    "install": ("install", ["i"], "install extensions"),
+    "uninstall": ("uninstall", [], "uninstall extensions"),
+    "update": ("update", ["u"], "update extensions"),
+    "enable": ("enable", [], "enable extensions"),
+    "disable": ("disable", [], "disable extensions"),
+    "preferences": ("preferences", ["p", "config"], "edit preferences of extension"),
+    "watch": ("watch", [], "watch extensions state changes"),
+    "daemon": ("daemon", [], "run a resident daemon to speed up gext calls"),
+}
+# subcommands which may prompt the user
+INTERACTIVE_COMMANDS = {"update"}
 
 
-def run():
+class VersionAction(Action):
     """
-    entry point
+    Print the version, only resolved when the option is used
     """
-    parser = ArgumentParser(description="Gnome Shell extensions manager")
 
-    parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {__version__}"
+    def __init__(self, option_strings, dest=SUPPRESS, default=SUPPRESS, **kwargs):
+        super().__init__(
+            option_strings,
+            dest=dest,
+            default=default,
+            nargs=0,
+            help="show program's version number and exit",
+            **kwargs,
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from . import __version__  # pylint: disable=import-outside-toplevel
+
+        print(parser.prog, __version__)
+        parser.exit()
+
+
+def load_command(name: str):
+    """
+    Import the module of the given subcommand
+    """
+    return import_module(f".commands.{COMMANDS[name][0]}", __package__)
+
+
+def find_command(alias: Optional[str]) -> Optional[str]:
+    """
+    Return the subcommand name of the given name or alias
+    """
+    for name, (_module, aliases, _help) in COMMANDS.items():
+        if alias == name or alias in aliases:
+            return name
+    return None
+
+
+def use_daemon(command: str) -> bool:
+    """
+    Check if the command can be run by the daemon. Its processes are not in the
+    foreground process group of the terminal, so commands which may prompt the user
+    run locally when the standard input is a terminal
+    """
+    if command == "daemon" or getenv("GEXT_NO_DAEMON") is not None:
+        return False
+    return command not in INTERACTIVE_COMMANDS or not (
+        sys.stdin is not None and sys.stdin.isatty()
     )
 
+
+def build_parser(command: Optional[str] = None) -> ArgumentParser:
+    """
+    Build the arguments parser, only the given subcommand is fully configured
+    """
+    parser = ArgumentParser(description="Gnome Shell extensions manager")
+
+    parser.add_argument("--version", action=VersionAction)
+
     parser.add_argument(
         "--no-color",
         action="store_true",
@@ -47,6 +104,34 @@ def run():
         action="store_false",
         help="when using filesystem backend, do not compile schemas with glib-compile-schemas if needed",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not use cached data (responses and archives) from Gnome website",
+    )
+    parser.add_argument(
+        "--shell-version",
+        metavar="VERSION",
+        help="use this Gnome Shell version instead of detecting it",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print the time spent in each phase of the command",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        type=Path,
+        help="write the phases of the command to FILE, in Chrome trace format",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        type=Path,
+        help="write metrics of the command to FILE, for the Prometheus node exporter "
+        + "textfile collector",
+    )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "-D",
@@ -65,43 +150,113 @@ def run():
         help="force filesystem backend",
     )
 
-    subparsers = parser.add_subparsers()
+    subparsers = parser.add_subparsers(dest="command")
+    for name, (_module, aliases, help_) in COMMANDS.items():
+        if name == command:
+            load_command(name).configure(
+                subparsers.add_parser(name, aliases=aliases, help=help_)
+            )
+        else:
+            # subcommand arguments are left unparsed
+            subparsers.add_parser(name, aliases=aliases, help=help_, add_help=False)
+    return parser
 
-    list_.configure(
-        subparsers.add_parser("list", aliases=["ls"], help="list installed extensions")
-    )
-    search.configure(
-        subparsers.add_parser("search", aliases=[], help="search for extensions")
-    )
-    show.configure(
-        subparsers.add_parser("show", aliases=[], help="show extensions details")
-    )
 
-    install.configure(
-        subparsers.add_parser("install", aliases=["i"], help="install extensions")
-    )
-    uninstall.configure(
-        subparsers.add_parser("uninstall", aliases=[], help="uninstall extensions")
-    )
-    update.configure(
-        subparsers.add_parser("update", aliases=["u"], help="update extensions")
-    )
+def create_manager(args: Namespace, store, resident: Optional["Resident"] = None):
+    """
+    Instantiate the extension manager for the selected backend
+    """
+    # pylint: disable=import-outside-toplevel
+    from .dbus import DbusExtensionManager, test_dbus_available
+    from .timings import span
+
+    backend = args.backend
+    if backend is None:
+        with span("backend-probe"):
+            backend = (
+                "dbus" if test_dbus_available(getenv("DEBUG") == "1") else "filesystem"
+            )
+    if backend == "dbus":
+        return DbusExtensionManager(shell_version=args.shell_version)
 
-    enable.configure(
-        subparsers.add_parser("enable", aliases=[], help="enable extensions")
+    from .cache import ArchiveCache, MetadataIndex
+    from .filesystem import FilesystemExtensionManager
+
+    metadata_index = None
+    if not args.no_cache:
+        metadata_index = (
+            resident.metadata_index if resident is not None else MetadataIndex()
+        )
+    return FilesystemExtensionManager(
+        store,
+        archive_cache=None if args.no_cache else ArchiveCache(),
+        metadata_index=metadata_index,
+        shell_version=args.shell_version
+        or (resident.shell_version if resident is not None else None),
     )
-    disable.configure(
-        subparsers.add_parser("disable", aliases=[], help="disable extensions")
+
+
+def print_timings(recorder: "Recorder"):
+    """
+    Print the count, total and longest duration of each phase, concurrent phases
+    overlap so totals can exceed the elapsed time
+    """
+    from .icons import Color, Icons  # pylint: disable=import-outside-toplevel
+
+    print(
+        Icons.TIMER,
+        "Timings",
+        Color.DEFAULT(f"(elapsed {recorder.elapsed() * 1000:.1f} ms)", style="dim"),
+        file=sys.stderr,
     )
-    preferences.configure(
-        subparsers.add_parser(
-            "preferences",
-            aliases=["p", "config"],
-            help="edit preferences of extension",
+    for name, count, total, longest in recorder.report():
+        print(
+            f"  {name:<20} {count:>5} {total * 1000:>10.1f} ms",
+            Color.DEFAULT(f"(max {longest * 1000:.1f} ms)", style="dim"),
+            file=sys.stderr,
         )
-    )
 
-    args = parser.parse_args()
+
+def run(argv: Optional[List[str]] = None, resident: Optional["Resident"] = None):
+    """
+    entry point, the daemon gives the arguments and its resident state
+    """
+    # first pass only selects the subcommand, handles --help and --version
+    args, _ = build_parser().parse_known_args(argv)
+    command = find_command(args.command) or "list"
+
+    if argv is None and use_daemon(command):
+        from .daemon import forward  # pylint: disable=import-outside-toplevel
+
+        code = forward(sys.argv)
+        if code is not None:
+            sys.exit(code)
+
+    parser = build_parser(command)
+
+    args = parser.parse_args(argv)
+
+    # pylint: disable=import-outside-toplevel
+    from .metrics import start_collecting, stop_collecting
+    from .timings import process_start, span, start_recording, stop_recording
+
+    recorder, registry = None, None
+    if args.metrics is not None:
+        registry = start_collecting(command=command)
+    if args.timings or args.trace is not None or registry is not None:
+        recorder = start_recording()
+        # commands run by the daemon do not start a process
+        started = process_start() if resident is None else None
+        if started is not None:
+            recorder.add("startup", started, recorder.origin - started)
+            recorder.origin = started
+
+    from colorama import init
+
+    from .cache import StoreCache
+    from .config import StoreConfig
+    from .icons import Color, Icons
+    from .store import GnomeExtensionStore
 
     # handle nocolor in output
     if args.no_color or getenv("NO_COLOR") is not None:
@@ -109,27 +264,53 @@ def run():
     else:
         init()
 
+    exit_code = 0
     try:
-        # instantiate store
-        store = GnomeExtensionStore()
-
-        # instantiate manager
-        manager = None
-        if args.backend == "dbus":
-            manager = DbusExtensionManager()
-        elif args.backend == "filesystem":
-            manager = FilesystemExtensionManager(store)
-        elif test_dbus_available(getenv("DEBUG") == "1"):
-            manager = DbusExtensionManager()
-        else:
-            manager = FilesystemExtensionManager(store)
-        handler = args.handler if "handler" in args else list_.run
-        handler(args, manager, store)
+        store, manager = None, None
+        if "need_manager" not in args or args.need_manager:
+            # instantiate store, the resident one unless its endpoints changed
+            config = StoreConfig.load()
+            if (
+                resident is not None
+                and not args.no_cache
+                and resident.store.url == config.url
+                and resident.store.mirrors == config.mirrors
+            ):
+                store = resident.store
+            else:
+                store = GnomeExtensionStore(
+                    url=config.url,
+                    mirrors=config.mirrors,
+                    cache=None if args.no_cache else StoreCache(),
+                )
+
+            # instantiate manager
+            manager = create_manager(args, store, resident)
+        handler = args.handler if "handler" in args else load_command("list").run
+        with span("command", command=command):
+            handler(args, manager, store)
     except KeyboardInterrupt:
+        exit_code = 1
         print(Icons.ERROR, "Process interrupted")
         sys.exit(1)
-    except SystemExit:
+    except SystemExit as error:
+        if error.code is None or isinstance(error.code, int):
+            exit_code = error.code or 0
+        else:
+            exit_code = 1
         raise
     except BaseException as error:  # pylint: disable=broad-except
+        exit_code = 1
         print(Icons.BOOM, "Error:", Color.RED(error))
         raise error
+    finally:
+        if recorder is not None:
+            stop_recording()
+            if args.timings:
+                print_timings(recorder)
+            if args.trace is not None:
+                recorder.save_trace(args.trace)
+        if registry is not None:
+            stop_collecting()
+            registry.record_run(exit_code, recorder)
+            registry.write(args.metrics)
@@ -0,0 +1,77 @@
+"""
+gnome-extensions-cli
+"""
+
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+
+from ..catalog import ExtensionCatalog
+from ..icons import Color, Icons, Label
+from ..manager import ExtensionManager
+from ..store import GnomeExtensionStore
+from .show import print_form
+
+
+def configure(parser: ArgumentParser):
+    """
+    Configure parser for subcommand
+    """
+    parser.set_defaults(handler=run_info)
+    subparsers = parser.add_subparsers()
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="download or refresh the local catalog"
+    )
+    sync_parser.set_defaults(handler=run_sync)
+    sync_parser.add_argument(
+        "--page-size",
+        type=int,
+        default=50,
+        metavar="N",
+        help="number of extensions fetched per request (default: 50)",
+    )
+
+    info_parser = subparsers.add_parser("info", help="show local catalog status")
+    info_parser.set_defaults(handler=run_info)
+
+
+def run_sync(args: Namespace, _manager: ExtensionManager, store: GnomeExtensionStore):
+    """
+    Handler for subcommand
+    """
+    catalog = ExtensionCatalog()
+    print("Synchronize catalog from", Label.url(store.endpoint, "/"))
+    added, updated, removed = catalog.sync(store, page_size=args.page_size)
+    print(
+        Icons.OK,
+        f"{catalog.count()} extensions in catalog",
+        f"({Color.GREEN(str(added))} added,",
+        f"{Color.YELLOW(str(updated))} updated,",
+        f"{Color.RED(str(removed))} removed)",
+    )
+
+
+def run_info(_args: Namespace, _manager: ExtensionManager, _store: GnomeExtensionStore):
+    """
+    Handler for subcommand
+    """
+    catalog = ExtensionCatalog()
+    if not catalog.exists():
+        print(
+            Icons.HINT,
+            "Local catalog is not synchronized, use",
+            Color.YELLOW("gext catalog sync"),
+        )
+        return
+    last_sync = catalog.get_property("last_sync")
+    print_form(
+        {
+            "path": catalog.path,
+            "extensions": catalog.count(),
+            "last sync": (
+                datetime.fromtimestamp(float(last_sync)).strftime("%c")
+                if last_sync is not None
+                else None
+            ),
+        }
+    )
@@ -0,0 +1,33 @@
+"""
+gnome-extensions-cli
+"""
+
+from argparse import ArgumentParser, Namespace
+
+from ..daemon import Resident, serve, socket_path
+from ..icons import Color, Icons
+
+
+def configure(parser: ArgumentParser):
+    """
+    Configure parser for subcommand
+    """
+    # the daemon must not open any connection, they would be shared with the
+    # processes running the commands
+    parser.set_defaults(handler=run, need_manager=False)
+
+
+def run(_args: Namespace, _manager: None, _store: None):
+    """
+    Handler for subcommand
+    """
+    path = socket_path()
+    assert path is not None, (
+        "Cannot find the user runtime folder, XDG_RUNTIME_DIR is not set"
+    )
+    resident = Resident.warm_up()
+    print(Icons.OK, "Daemon listening on", Color.BLUE(path), flush=True)
+    try:
+        serve(path, resident)
+    except KeyboardInterrupt:
+        print(Icons.OK, "Daemon stopped")
@@ -6,6 +6,7 @@ from argparse import ZERO_OR_MORE, ArgumentParser, Namespace
 
 from ..icons import Color
 from ..manager import ExtensionManager
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
 
 
@@ -34,11 +35,11 @@ def run(args: Namespace, manager: ExtensionManager, _store: GnomeExtensionStore)
     """
     uuids = list(set(args.uuids))
     if args.not_installed:
-        installed_uuids = [e.uuid for e in manager.list_installed_extensions()]
+        state = StateSnapshot.load(manager, shell_version=False)
         uuids += [
             uuid
-            for uuid in manager.list_enabled_uuids()
-            if uuid not in installed_uuids and uuid not in args.uuids
+            for uuid in state.enabled_uuids
+            if uuid not in state and uuid not in args.uuids
         ]
     print("Disable extension(s):")
     for uuid in uuids:
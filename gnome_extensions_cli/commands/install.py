@@ -3,13 +3,16 @@ gnome-extensions-cli
 """
 
 from argparse import ONE_OR_MORE, ArgumentParser, Namespace
+from typing import Optional
 
 from tqdm import tqdm
 
 from ..icons import Color, Icons, Label
 from ..manager import ExtensionManager
+from ..pipeline import InstallPipeline
+from ..schema import AvailableExtension
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
-from ..utils import version_comparator
 
 
 def configure(parser: ArgumentParser):
@@ -26,47 +29,58 @@ def configure(parser: ArgumentParser):
     )
 
 
+def needs_install(
+    state: StateSnapshot, available_ext: Optional[AvailableExtension]
+) -> bool:
+    """
+    Check if the available extension is not installed or is newer than installed one
+    """
+    if available_ext is None:
+        return False
+    entry = state.attach(available_ext)
+    if entry is None:
+        return True
+    return entry.extension.metadata.version_key < available_ext.version_key
+
+
 def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
     """
     Handler for subcommand
     """
-    installed_extensions = {e.uuid: e for e in manager.list_installed_extensions()}
-    enabled_uuids = manager.list_enabled_uuids()
-    shell_version = manager.get_current_shell_version()
+    state = StateSnapshot.load(manager)
 
-    extensions_to_fetch = dict.fromkeys(args.extensions)
-    fetched_extensions = {
-        uuid: ext
+    with InstallPipeline(manager, max_workers=store.max_workers) as pipeline:
+        # extensions are downloaded as soon as they are fetched
+        extensions_to_fetch = dict.fromkeys(args.extensions)
+        fetched_extensions = {}
         for uuid, ext in tqdm(
-            store.iter_fetch(extensions_to_fetch, shell_version=shell_version),
+            store.iter_fetch(extensions_to_fetch, shell_version=state.shell_version),
             unit=" extension(s) fetched",
             total=len(extensions_to_fetch),
-        )
-    }
-
-    for motif, available_ext in fetched_extensions.items():
-        if available_ext is None:
-            print(Icons.ERROR, "Cannot find extension", Color.RED(motif))
-        elif available_ext.uuid not in installed_extensions:
-            print(Icons.PACKAGE, "Install", Label.available(available_ext))
-            manager.install_extension(available_ext)
-        elif (
-            version_comparator(
-                installed_extensions[available_ext.uuid].metadata.version,
-                available_ext.version,
-            )
-            > 0
         ):
-            print(Icons.PACKAGE, "Upgrade", Label.available(available_ext))
-            manager.install_extension(available_ext)
-        elif available_ext.uuid not in enabled_uuids:
-            print(Icons.HINT, "Enable", Label.available(available_ext))
-            manager.enable_uuids(available_ext.uuid)
-        else:
-            print(
-                Icons.DRYRUN,
-                "Extension",
-                Label.available(available_ext),
-                "is already installed",
-            )
-            manager.enable_uuids(available_ext.uuid)
+            fetched_extensions[uuid] = ext
+            if needs_install(state, ext):
+                pipeline.submit(ext)
+
+        # apply enabled extensions and restart the shell once for all extensions
+        with manager.transaction():
+            for motif, available_ext in fetched_extensions.items():
+                if available_ext is None:
+                    print(Icons.ERROR, "Cannot find extension", Color.RED(motif))
+                elif available_ext.uuid not in state:
+                    print(Icons.PACKAGE, "Install", Label.available(available_ext))
+                    pipeline.install(available_ext)
+                elif needs_install(state, available_ext):
+                    print(Icons.PACKAGE, "Upgrade", Label.available(available_ext))
+                    pipeline.install(available_ext)
+                elif not state.is_enabled(available_ext.uuid):
+                    print(Icons.HINT, "Enable", Label.available(available_ext))
+                    manager.enable_uuids(available_ext.uuid)
+                else:
+                    print(
+                        Icons.DRYRUN,
+                        "Extension",
+                        Label.available(available_ext),
+                        "is already installed",
+                    )
+                    manager.enable_uuids(available_ext.uuid)
@@ -6,6 +6,7 @@ from argparse import ArgumentParser, Namespace
 
 from ..icons import Color, Icons, Label
 from ..manager import ExtensionManager
+from ..state import ExtensionEntry, StateSnapshot
 from ..store import GnomeExtensionStore
 
 
@@ -37,39 +38,40 @@ def run(args: Namespace, manager: ExtensionManager, _store: GnomeExtensionStore)
     show_all = "all" in args and args.all
     only_uuid = "only_uuid" in args and args.only_uuid
 
+    state = StateSnapshot.load(manager, shell_version=verbose)
+
     if verbose:
-        print("Gnome Shell", Label.version(manager.get_current_shell_version()))
+        print("Gnome Shell", Label.version(state.shell_version))
         print()
         print(
             "Installed Extensions:",
             f"(enabled: {Icons.DOT_BLUE}, disabled: {Icons.DOT_WHITE})",
         )
 
-    installed_extensions = sorted(
-        manager.list_installed_extensions(), key=lambda x: x.uuid.lower()
-    )
-    enabled_uuids = manager.list_enabled_uuids()
+    def label(entry: ExtensionEntry) -> str:
+        out = Label.installed(entry.extension, enabled=entry.enabled)
+        if verbose and entry.extension.state is not None:
+            out += " " + Color.LIGHTBLACK_EX(entry.extension.state.name.lower())
+        return out
 
-    for installed_ext in installed_extensions:
-        if installed_ext.uuid in enabled_uuids:
+    for entry in state:
+        if entry.enabled:
             if only_uuid:
-                print(installed_ext.metadata.uuid)
+                print(entry.uuid)
             else:
-                print(Icons.DOT_BLUE, Label.installed(installed_ext, enabled=True))
+                print(Icons.DOT_BLUE, label(entry))
 
     if show_all:
-        for installed_ext in installed_extensions:
-            if installed_ext.uuid not in enabled_uuids:
+        for entry in state:
+            if not entry.enabled:
                 if only_uuid:
-                    print(installed_ext.metadata.uuid)
+                    print(entry.uuid)
                 else:
-                    print(
-                        Icons.DOT_WHITE, Label.installed(installed_ext, enabled=False)
-                    )
+                    print(Icons.DOT_WHITE, label(entry))
 
     if verbose:
         print()
         print(
             "Enabled uuids:",
-            ", ".join(map(Color.YELLOW, sorted(enabled_uuids, key=str.lower))),
+            ", ".join(map(Color.YELLOW, sorted(state.enabled_uuids, key=str.lower))),
         )
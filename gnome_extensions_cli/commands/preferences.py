@@ -5,6 +5,7 @@ gnome-extensions-cli
 from argparse import ArgumentParser, Namespace
 
 from ..manager import ExtensionManager
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
 
 
@@ -25,8 +26,6 @@ def run(args: Namespace, manager: ExtensionManager, _store: GnomeExtensionStore)
     """
     Handler for subcommand
     """
-    ext = next(
-        filter(lambda e: e.uuid == args.uuid, manager.list_installed_extensions()), None
-    )
-    assert ext is not None, f"Extension {args.uuid} is not installed"
-    manager.edit_extension(ext)
+    entry = StateSnapshot.load(manager, shell_version=False).get(args.uuid)
+    assert entry is not None, f"Extension {args.uuid} is not installed"
+    manager.edit_extension(entry.extension)
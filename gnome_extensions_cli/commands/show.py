@@ -2,13 +2,16 @@
 gnome-extensions-cli
 """
 
+import sys
 from argparse import ONE_OR_MORE, ArgumentParser, Namespace
 from typing import Any, Dict, Iterable, List, Optional, Union
 
 from gnome_extensions_cli.schema import AvailableExtension
 
+from ..catalog import ExtensionCatalog
 from ..icons import Color, Icons, Label
 from ..manager import ExtensionManager
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
 
 INDENT = "  "
@@ -19,6 +22,11 @@ def configure(parser: ArgumentParser):
     Configure parser for subcommand
     """
     parser.set_defaults(handler=run)
+    parser.add_argument(
+        "--online",
+        action="store_true",
+        help="query Gnome website even if the local catalog is synchronized",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="display more information"
     )
@@ -81,19 +89,45 @@ def build_versions_dict(ext: AvailableExtension) -> Dict[int, List[str]]:
     return out
 
 
+def select_source(
+    store: GnomeExtensionStore, online: bool = False
+) -> Union[GnomeExtensionStore, ExtensionCatalog]:
+    """
+    Use the local catalog once synchronized, unless online is requested, and warn
+    when it is out of date
+    """
+    catalog = ExtensionCatalog()
+    if online or not catalog.exists():
+        return store
+    if catalog.is_stale():
+        days = int((catalog.age() or 0) // 86400)
+        print(
+            Icons.WARNING,
+            f"Local catalog was synchronized {days} days ago,",
+            "use",
+            Color.YELLOW("gext catalog sync"),
+            "or",
+            Color.YELLOW("--online"),
+            file=sys.stderr,
+        )
+    return catalog
+
+
 def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
     """
     Handler for subcommand
     """
-    installed_extensions = {e.uuid: e for e in manager.list_installed_extensions()}
+    state = StateSnapshot.load(manager)
+    shell_version = state.shell_version
 
-    shell_version = manager.get_current_shell_version()
+    source = select_source(store, args.online)
 
-    for motif, available_ext in store.iter_fetch(
+    for motif, available_ext in source.iter_fetch(
         dict.fromkeys(args.extensions), shell_version=shell_version
     ):
         if available_ext is not None:
-            installed_ext = installed_extensions.get(available_ext.uuid)
+            entry = state.get(available_ext.uuid)
+            installed_ext = entry.extension if entry is not None else None
             print(
                 Icons.DOT_BLUE if installed_ext is not None else Icons.DOT_WHITE,
                 Color.DEFAULT(available_ext.name, style="bright"),
@@ -102,10 +136,10 @@ def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
 
             print_form(
                 {
-                    "link": Label.url(store.url, available_ext.link),
-                    "screenshot": Label.url(store.url, available_ext.screenshot),
+                    "link": Label.url(store.endpoint, available_ext.link),
+                    "screenshot": Label.url(store.endpoint, available_ext.screenshot),
                     "creator": available_ext.creator,
-                    "creator_url": Label.url(store.url, available_ext.creator_url),
+                    "creator_url": Label.url(store.endpoint, available_ext.creator_url),
                     "description": available_ext.description if args.verbose else None,
                     "tag": available_ext.version_tag,
                     "pk": available_ext.pk,
@@ -119,13 +153,13 @@ def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
                 indent="    ",
             )
             continue
-            print_key_value("link", Label.url(store.url, available_ext.link), 1)
+            print_key_value("link", Label.url(store.endpoint, available_ext.link), 1)
             print_key_value(
-                "screenshot", Label.url(store.url, available_ext.screenshot), 1
+                "screenshot", Label.url(store.endpoint, available_ext.screenshot), 1
             )
             print_key_value("creator", available_ext.creator, 1)
             print_key_value(
-                "creator_url", Label.url(store.url, available_ext.creator_url), 1
+                "creator_url", Label.url(store.endpoint, available_ext.creator_url), 1
             )
             if args.verbose:
                 print_key_value("description", available_ext.description, 1)
@@ -6,6 +6,7 @@ from argparse import ONE_OR_MORE, ArgumentParser, Namespace
 
 from ..icons import Color, Icons, Label
 from ..manager import ExtensionManager
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
 
 
@@ -27,15 +28,17 @@ def run(args: Namespace, manager: ExtensionManager, _store: GnomeExtensionStore)
     """
     Handler for subcommand
     """
-    installed_extensions = {e.uuid: e for e in manager.list_installed_extensions()}
+    state = StateSnapshot.load(manager, shell_version=False)
     for uuid in dict.fromkeys(args.uuids):
-        installed_extension = installed_extensions.get(uuid)
-        if installed_extension is None:
+        entry = state.get(uuid)
+        if entry is None:
             print(
                 Icons.WARNING,
                 f"Extension {Color.RED(uuid)} is not installed",
             )
-        elif installed_extension.read_only:
+            continue
+        installed_extension = entry.extension
+        if entry.read_only:
             print(
                 Icons.HINT,
                 "Cannot uninstall",
@@ -3,13 +3,18 @@ gnome-extensions-cli
 """
 
 from argparse import ZERO_OR_MORE, ArgumentParser, Namespace
+from typing import Optional
 
 from tqdm import tqdm
 
+from .. import metrics
 from ..icons import Color, Icons, Label
 from ..manager import ExtensionManager
+from ..pipeline import InstallPipeline
+from ..schema import AvailableExtension
+from ..state import StateSnapshot
 from ..store import GnomeExtensionStore
-from ..utils import confirm, version_comparator
+from ..utils import confirm
 
 
 def configure(parser: ArgumentParser):
@@ -50,13 +55,46 @@ def configure(parser: ArgumentParser):
     )
 
 
+OUTDATED = "outdated"
+NOT_INSTALLED = "not installed"
+SYSTEM = "skip system extension"
+UP_TO_DATE = "up-to-date"
+
+# counters of the gext_update_extensions metric
+COUNTERS = ("checked", "not_found", "outdated", "updated", "installed", "failed")
+
+
+def get_status(
+    args: Namespace,
+    state: StateSnapshot,
+    available_ext: AvailableExtension,
+) -> str:
+    """
+    Compare an available extension with the installed one
+    """
+    entry = state.attach(available_ext)
+    if entry is None:
+        return NOT_INSTALLED
+    if args.user and entry.read_only:
+        # extension is readonly, update only user extensions
+        return SYSTEM
+    if entry.extension.metadata.version_key < available_ext.version_key:
+        return OUTDATED
+    return UP_TO_DATE
+
+
+def is_selected(args: Namespace, status: Optional[str]) -> bool:
+    """
+    Check if an extension with given status should be updated or installed
+    """
+    return status == OUTDATED or (status == NOT_INSTALLED and args.install)
+
+
 def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
     """
     Handler for subcommand
     """
-    installed_extensions = {e.uuid: e for e in manager.list_installed_extensions()}
-    enabled_uuids = manager.list_enabled_uuids()
-    shell_version = manager.get_current_shell_version()
+    state = StateSnapshot.load(manager)
 
     extensions_to_fetch = []
     if len(args.extensions):
@@ -64,74 +102,63 @@ def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
         extensions_to_fetch = args.extensions
     else:
         # Update all installed extensions that are enable and that have a version
-        for uuid, ext in installed_extensions.items():
-            if uuid in enabled_uuids and ext.metadata.version is not None:
-                extensions_to_fetch.append(uuid)
-
-    # fetch available
-    fetched_extensions = {
-        uuid: ext
-        for uuid, ext in tqdm(
-            store.iter_fetch(extensions_to_fetch, shell_version=shell_version),
+        for entry in state:
+            if entry.enabled and entry.extension.metadata.version is not None:
+                extensions_to_fetch.append(entry.uuid)
+
+    for name in COUNTERS:
+        metrics.set_value("gext_update_extensions", 0, status=name)
+
+    with InstallPipeline(manager, max_workers=store.max_workers) as pipeline:
+        # fetch available, when no confirmation is needed outdated extensions
+        # are downloaded as soon as they are fetched
+        fetched_extensions = {}
+        for uuid, available_ext in tqdm(
+            store.iter_fetch(extensions_to_fetch, shell_version=state.shell_version),
             unit=" extension(s) fetched",
             total=len(extensions_to_fetch),
-        )
-    }
-    extensions_to_update = []
-    extensions_to_install = []
-    count = 0
-    for uuid, available_ext in fetched_extensions.items():
-        count += 1
-        progress = f"[{count}]"
-        if available_ext is None:
-            # cannot fetch extension
-            print(progress, "Cannot find extension", Color.RED(uuid))
-        elif available_ext.uuid not in installed_extensions:
-            # extension is not installed
-            print(
-                progress,
-                "Found extension",
-                Label.available(available_ext),
-                ": not installed",
-            )
-            if args.install:
-                extensions_to_install.append(available_ext)
-        elif args.user and installed_extensions[available_ext.uuid].read_only:
-            # extension is readonly, update only user extensions
-            print(
-                progress,
-                "Found extension",
-                Label.available(available_ext),
-                ": skip system extension",
-            )
-        elif (
-            version_comparator(
-                installed_extensions[available_ext.uuid].metadata.version,
-                available_ext.version,
-            )
-            > 0
         ):
-            # extension can be updated
-            print(
-                progress,
-                "Found extension",
-                Label.available(available_ext),
-                ": outdated",
+            status = (
+                get_status(args, state, available_ext)
+                if available_ext is not None
+                else None
             )
-            extensions_to_update.append(available_ext)
-        else:
-            # extension is up to date
+            fetched_extensions[uuid] = (available_ext, status)
+            metrics.inc("gext_update_extensions", status="checked")
+            if available_ext is None:
+                metrics.inc("gext_update_extensions", status="not_found")
+            elif status == OUTDATED:
+                metrics.inc("gext_update_extensions", status="outdated")
+            if args.yes and is_selected(args, status):
+                pipeline.submit(available_ext)
+
+        extensions_to_update = []
+        extensions_to_install = []
+        count = 0
+        for uuid, (available_ext, status) in fetched_extensions.items():
+            count += 1
+            progress = f"[{count}]"
+            if available_ext is None:
+                # cannot fetch extension
+                print(progress, "Cannot find extension", Color.RED(uuid))
+                continue
             print(
                 progress,
                 "Found extension",
                 Label.available(available_ext),
-                ": up-to-date",
+                f": {status}",
             )
-    print("")
+            if is_selected(args, status):
+                if status == OUTDATED:
+                    extensions_to_update.append(available_ext)
+                else:
+                    extensions_to_install.append(available_ext)
+        print("")
+
+        if len(extensions_to_update) + len(extensions_to_install) == 0:
+            print(Icons.THUMB_UP, "Nothing to update")
+            return
 
-    if len(extensions_to_update) + len(extensions_to_install) == 0:
-        print(Icons.THUMB_UP, "Nothing to update")
-    else:
         if len(extensions_to_update) > 0:
             print(Icons.PACKAGE, "Extensions to update:")
             for ext in extensions_to_update:
@@ -147,13 +174,31 @@ def run(args: Namespace, manager: ExtensionManager, store: GnomeExtensionStore):
             raise SystemExit(17)
 
         if args.yes or confirm("Continue?", default=True):
-            for available_extension in extensions_to_update:
-                installed_extension = installed_extensions[available_extension.uuid]
-                print("Update", Label.available(available_extension))
-                if installed_extension.metadata.version is not None:
-                    print("  over", Label.version(installed_extension.metadata.version))
-                manager.install_extension(available_extension)
-
-            for available_extension in extensions_to_install:
-                print("Install", Label.available(available_extension))
-                manager.install_extension(available_extension)
+            for available_extension in extensions_to_update + extensions_to_install:
+                pipeline.submit(available_extension)
+
+            # apply enabled extensions and restart the shell once for all extensions
+            with manager.transaction():
+                for available_extension in extensions_to_update:
+                    installed_extension = state.by_uuid[
+                        available_extension.uuid
+                    ].extension
+                    print("Update", Label.available(available_extension))
+                    if installed_extension.metadata.version is not None:
+                        print(
+                            "  over",
+                            Label.version(installed_extension.metadata.version),
+                        )
+                    success = pipeline.install(available_extension)
+                    metrics.inc(
+                        "gext_update_extensions",
+                        status="updated" if success else "failed",
+                    )
+
+                for available_extension in extensions_to_install:
+                    print("Install", Label.available(available_extension))
+                    success = pipeline.install(available_extension)
+                    metrics.inc(
+                        "gext_update_extensions",
+                        status="installed" if success else "failed",
+                    )
@@ -0,0 +1,84 @@
+"""
+gnome-extensions-cli
+"""
+
+from argparse import ArgumentParser, Namespace
+from typing import Dict, Optional
+
+from ..dbus import DbusExtensionManager
+from ..icons import Color, Icons, Label
+from ..manager import ExtensionManager
+from ..schema import ExtensionState, InstalledExtension
+from ..store import GnomeExtensionStore
+
+STATE_ICONS = {
+    ExtensionState.ENABLED: Icons.DOT_BLUE,
+    ExtensionState.DISABLED: Icons.DOT_WHITE,
+    ExtensionState.INITIALIZED: Icons.DOT_WHITE,
+    ExtensionState.ERROR: Icons.DOT_RED,
+    ExtensionState.OUT_OF_DATE: Icons.DOT_RED,
+    ExtensionState.UNINSTALLED: Icons.TRASH,
+}
+
+
+def configure(parser: ArgumentParser):
+    """
+    Configure parser for subcommand
+    """
+    parser.set_defaults(handler=run)
+
+    parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="print the state of all installed extensions first",
+    )
+
+
+def state_label(state: Optional[ExtensionState]) -> str:
+    """
+    Readable name of an extension state
+    """
+    return state.name.lower() if state is not None else "unknown"
+
+
+def run(args: Namespace, manager: ExtensionManager, _store: GnomeExtensionStore):
+    """
+    Handler for subcommand
+    """
+    assert isinstance(manager, DbusExtensionManager), (
+        "Watching extensions requires the DBus backend"
+    )
+
+    states: Dict[str, InstalledExtension] = {
+        ext.uuid: ext for ext in manager.list_installed_extensions()
+    }
+    if args.all:
+        for ext in sorted(states.values(), key=lambda x: x.uuid.lower()):
+            print(
+                STATE_ICONS.get(ext.state, Icons.DOT_BLACK),
+                Label.installed(ext),
+                Color.LIGHTBLACK_EX(state_label(ext.state)),
+            )
+    print(Icons.HINT, "Watching extensions state changes, press Ctrl+C to stop")
+
+    def on_change(ext: InstalledExtension):
+        previous = states.get(ext.uuid)
+        if previous is not None and previous.state == ext.state:
+            return
+        states[ext.uuid] = ext
+        print(
+            STATE_ICONS.get(ext.state, Icons.DOT_BLACK),
+            Label.installed(ext),
+            Color.LIGHTBLACK_EX(
+                state_label(previous.state if previous is not None else None)
+            ),
+            "->",
+            Color.YELLOW(state_label(ext.state)),
+            flush=True,
+        )
+
+    try:
+        manager.watch_extensions(on_change)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,57 @@
+"""
+gnome-extensions-cli
+"""
+
+import os
+import re
+from configparser import ConfigParser
+from dataclasses import dataclass, field
+from os.path import expanduser
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_STORE_URL = "https://extensions.gnome.org"
+
+
+def config_file() -> Path:
+    """
+    Return the path of the user configuration file
+    """
+    return (
+        Path(os.getenv("XDG_CONFIG_HOME") or expanduser("~/.config"))
+        / "gnome-extensions-cli"
+        / "config.ini"
+    )
+
+
+def split_urls(value: str) -> List[str]:
+    """
+    Split a list of urls separated by spaces, commas or new lines
+    """
+    return [url.rstrip("/") for url in re.split(r"[\s,]+", value) if len(url) > 0]
+
+
+@dataclass
+class StoreConfig:
+    """
+    Store url and its mirrors, read from the [store] section of the configuration
+    file then from GEXT_STORE_URL and GEXT_STORE_MIRRORS
+    """
+
+    url: str = DEFAULT_STORE_URL
+    mirrors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "StoreConfig":
+        parser = ConfigParser()
+        parser.read(path or config_file(), encoding="utf-8")
+        out = cls()
+        if parser.has_section("store"):
+            out.url = parser["store"].get("url", out.url).rstrip("/")
+            out.mirrors = split_urls(parser["store"].get("mirrors", ""))
+        if os.getenv("GEXT_STORE_URL"):
+            out.url = os.environ["GEXT_STORE_URL"].rstrip("/")
+        if os.getenv("GEXT_STORE_MIRRORS") is not None:
+            out.mirrors = split_urls(os.environ["GEXT_STORE_MIRRORS"])
+        out.mirrors = [url for url in dict.fromkeys(out.mirrors) if url != out.url]
+        return out
@@ -0,0 +1,281 @@
+"""
+gnome-extensions-cli
+"""
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from traceback import print_exc
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .cache import MetadataIndex
+    from .store import GnomeExtensionStore
+
+SOCKET_NAME = "gnome-extensions-cli.sock"
+# messages are prefixed by their size, the daemon replies with the pid of the process
+# running the command, then its exit code
+HEADER = struct.Struct("!i")
+
+
+def socket_path() -> Optional[Path]:
+    """
+    Return the path of the daemon socket, in the user runtime folder
+    """
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    return Path(runtime_dir) / SOCKET_NAME if runtime_dir else None
+
+
+def supported() -> bool:
+    """
+    Passing file descriptors with socket.send_fds needs Python 3.9
+    """
+    return hasattr(socket, "send_fds")
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Read the given number of bytes from the socket
+    """
+    out = b""
+    while len(out) < size:
+        chunk = sock.recv(size - len(out))
+        if len(chunk) == 0:
+            raise ConnectionError("Connection closed")
+        out += chunk
+    return out
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Run the command in the daemon, with the standard streams, working directory and
+    environment of the current process. Return its exit code or None if the daemon
+    is not running
+    """
+    path = socket_path()
+    if path is None or not supported() or not path.exists():
+        return None
+    payload = json.dumps(
+        {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    ).encode()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            socket.send_fds(sock, [HEADER.pack(len(payload))], [0, 1, 2])
+            sock.sendall(payload)
+            (pid,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+        except OSError:
+            # stale socket or unusable standard streams, run the command locally
+            return None
+        while True:
+            try:
+                (code,) = HEADER.unpack(recv_exactly(sock, HEADER.size))
+                return code
+            except KeyboardInterrupt:
+                # the command does not run in the foreground process group
+                try:
+                    os.kill(pid, signal.SIGINT)
+                except OSError:
+                    pass
+            except OSError:
+                print("Connection to gext daemon lost", file=sys.stderr)
+                return 1
+
+
+@dataclass
+class Resident:
+    """
+    State kept warm by the daemon, inherited by the processes running the commands
+    """
+
+    store: "GnomeExtensionStore"
+    metadata_index: "MetadataIndex"
+    shell_version: Optional[str] = None
+    index_signature: Optional[Tuple[int, int]] = field(default=None, init=False)
+
+    @classmethod
+    def warm_up(cls) -> "Resident":
+        """
+        Import all commands and dependencies, then build the resident state.
+        No DBus nor HTTP connection is opened, they would be shared by the forked
+        processes
+        """
+        # pylint: disable=import-outside-toplevel,unused-import
+        from .cache import MetadataIndex, StoreCache
+        from .cli import COMMANDS, load_command
+        from .config import StoreConfig
+        from .store import GnomeExtensionStore
+
+        for name in COMMANDS:
+            load_command(name)
+        try:
+            from gi.repository import Gio  # noqa: F401
+        except ImportError:
+            pass
+
+        config = StoreConfig.load()
+        store = GnomeExtensionStore(
+            url=config.url, mirrors=config.mirrors, cache=StoreCache()
+        )
+        # only builds the session, connections are opened by the forked processes
+        _ = store.session
+        out = cls(store, MetadataIndex())
+        out.refresh()
+        return out
+
+    def refresh(self):
+        """
+        Reload the parts of the state which changed on disk
+        """
+        # pylint: disable=import-outside-toplevel
+        from subprocess import SubprocessError
+
+        from .cache import MetadataIndex
+        from .dconf import ENABLED_EXTENSIONS_KEY, read_string_array
+        from .shell import detect_shell_version
+
+        try:
+            stat = self.metadata_index.path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature != self.index_signature:
+            # the index was saved by a command
+            self.metadata_index = MetadataIndex(self.metadata_index.path)
+            self.index_signature = signature
+        try:
+            self.shell_version = detect_shell_version()
+        except (AssertionError, OSError, SubprocessError):
+            self.shell_version = None
+        read_string_array(ENABLED_EXTENSIONS_KEY)
+
+
+def receive(conn: socket.socket) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Read a request and the file descriptors of the client standard streams
+    """
+    message, fds, _flags, _address = socket.recv_fds(conn, HEADER.size, 3)
+    try:
+        assert len(fds) == 3 and len(message) == HEADER.size, "Invalid request"
+        (size,) = HEADER.unpack(message)
+        return json.loads(recv_exactly(conn, size)), fds
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def execute(argv: List[str], resident: Resident) -> int:
+    """
+    Run the command in the current process, return its exit code
+    """
+    from .cli import run  # pylint: disable=import-outside-toplevel
+
+    try:
+        run(argv[1:], resident)
+    except SystemExit as error:
+        if error.code is None or isinstance(error.code, int):
+            return error.code or 0
+        print(error.code, file=sys.stderr)
+        return 1
+    except BaseException:  # pylint: disable=broad-except
+        print_exc()
+        return 1
+    return 0
+
+
+def run_request(
+    conn: socket.socket, request: Dict[str, Any], fds: List[int], resident: Resident
+):
+    """
+    Run a request in a forked process, which never returns
+    """
+    code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        conn.sendall(HEADER.pack(os.getpid()))
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        for fd in set(fds) - {0, 1, 2}:
+            os.close(fd)
+        # pylint: disable=consider-using-with
+        sys.stdin = open(0, encoding="utf-8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", buffering=1, closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", buffering=1, closefd=False)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = request["argv"]
+        code = execute(request["argv"], resident)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(HEADER.pack(code))
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+
+
+def serve(path: Path, resident: Resident):
+    """
+    Accept requests on the given socket until terminated, each command runs in a
+    forked process
+    """
+    assert supported(), "The daemon requires Python 3.9 or newer"
+    if path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(path))
+                running = True
+            except ConnectionError:
+                running = False
+        assert not running, f"Daemon is already running on {path}"
+        # stale socket
+        path.unlink()
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(umask)
+    server.listen()
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                # reap finished commands
+                try:
+                    while os.waitpid(-1, os.WNOHANG)[0] > 0:
+                        pass
+                except ChildProcessError:
+                    pass
+                _pid, uid, _gid = struct.unpack(
+                    "3i",
+                    conn.getsockopt(
+                        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+                    ),
+                )
+                if uid != os.getuid():
+                    continue
+                try:
+                    request, fds = receive(conn)
+                except (OSError, ValueError, AssertionError, struct.error):
+                    continue
+                resident.refresh()
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    server.close()
+                    run_request(conn, request, fds, resident)
+                for fd in fds:
+                    os.close(fd)
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
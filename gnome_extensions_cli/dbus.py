@@ -2,16 +2,27 @@
 gnome-extensions-cli
 """
 
-from operator import itemgetter
-from pathlib import Path
+from functools import cached_property, lru_cache
 from traceback import print_exc
-from typing import List
+from typing import Any, Callable, List, Optional
 
 from .manager import ExtensionManager
 from .schema import AvailableExtension, InstalledExtension
+from .timings import span
 
 DBUS_INTERFACE = "org.gnome.Shell"
 DBUS_PATH = "/org/gnome/Shell"
+DBUS_TIMEOUT = -1
+
+
+@lru_cache(maxsize=None)
+def session_bus():
+    """
+    Return the session bus connection, shared by the availability test and managers
+    """
+    from gi.repository import Gio  # pylint: disable=import-outside-toplevel
+
+    return Gio.bus_get_sync(Gio.BusType.SESSION, None)
 
 
 def test_dbus_available(debug: bool = False) -> bool:
@@ -19,10 +30,7 @@ def test_dbus_available(debug: bool = False) -> bool:
     Test if DBus is available
     """
     try:
-        from gi.repository import Gio  # pylint: disable=import-outside-toplevel
-
-        dbus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
-        return dbus is not None
+        return session_bus() is not None
     except BaseException:  # pylint: disable=broad-except
         if debug:
             print_exc()
@@ -36,54 +44,93 @@ class DbusExtensionManager(ExtensionManager):
     dbus schema: /usr/share/dbus-1/interfaces/org.gnome.Shell.Extensions.xml
     """
 
-    def __init__(self):
+    def __init__(self, shell_version: Optional[str] = None):
+        self.shell_version = shell_version
+
+    @cached_property
+    def proxy_extensions(self):
+        """
+        Proxy for the extensions interface, properties are never used so they are
+        not loaded and no signal is subscribed
+        """
         from gi.repository import Gio  # pylint: disable=import-outside-toplevel
 
-        dbus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
-        self.proxy_extensions = Gio.DBusProxy.new_sync(
-            dbus,
-            Gio.DBusProxyFlags.NONE,
+        return Gio.DBusProxy.new_sync(
+            session_bus(),
+            Gio.DBusProxyFlags.DO_NOT_LOAD_PROPERTIES
+            | Gio.DBusProxyFlags.DO_NOT_CONNECT_SIGNALS,
             None,
             DBUS_INTERFACE,
-            "/org/gnome/Shell",
+            DBUS_PATH,
             "org.gnome.Shell.Extensions",
             None,
         )
-        self.proxy_properties = Gio.DBusProxy.new_sync(
-            dbus,
-            Gio.DBusProxyFlags.NONE,
-            None,
-            DBUS_INTERFACE,
-            "/org/gnome/Shell",
-            "org.freedesktop.DBus.Properties",
-            None,
-        )
-        self.settings = Gio.Settings.new("org.gnome.shell")
+
+    @cached_property
+    def settings(self):
+        from gi.repository import Gio  # pylint: disable=import-outside-toplevel
+
+        return Gio.Settings.new("org.gnome.shell")
 
     def get_current_shell_version(self) -> str:
-        return self.proxy_properties.Get("(ss)", DBUS_INTERFACE, "ShellVersion")
+        if self.shell_version is None:
+            # pylint: disable=import-outside-toplevel
+            from gi.repository import Gio, GLib
+
+            with span("shell-version"):
+                # a single call, without building a proxy for the properties interface
+                reply = session_bus().call_sync(
+                    DBUS_INTERFACE,
+                    DBUS_PATH,
+                    "org.freedesktop.DBus.Properties",
+                    "Get",
+                    GLib.Variant("(ss)", (DBUS_INTERFACE, "ShellVersion")),
+                    GLib.VariantType.new("(v)"),
+                    Gio.DBusCallFlags.NONE,
+                    DBUS_TIMEOUT,
+                    None,
+                )
+                self.shell_version = reply.unpack()[0]
+        return self.shell_version
 
     def list_installed_extensions(self) -> List[InstalledExtension]:
-        return list(
-            map(
-                InstalledExtension,
-                filter(
-                    Path.exists,
-                    map(
-                        Path,
-                        filter(
-                            None,
-                            map(
-                                itemgetter("path"),
-                                self.proxy_extensions.ListExtensions().values(),
-                            ),
-                        ),
-                    ),
-                ),
-            )
+        # the reply contains metadata and state, no need to read metadata files
+        with span("installed-scan"):
+            return [
+                InstalledExtension.from_dbus(info)
+                for info in self.proxy_extensions.ListExtensions().values()
+                if info.get("path")
+            ]
+
+    def watch_extensions(self, callback: Callable[[InstalledExtension], None]):
+        """
+        Call the given callback with the updated extension each time the state of
+        an extension changes, until interrupted
+        """
+        # pylint: disable=import-outside-toplevel
+        from gi.repository import Gio, GLib
+
+        def on_signal(_connection, _sender, _path, _interface, _signal, parameters):
+            uuid, info = parameters.unpack()
+            if info.get("path"):
+                callback(InstalledExtension.from_dbus({"uuid": uuid, **info}))
+
+        connection = session_bus()
+        subscription = connection.signal_subscribe(
+            DBUS_INTERFACE,
+            "org.gnome.Shell.Extensions",
+            "ExtensionStateChanged",
+            DBUS_PATH,
+            None,
+            Gio.DBusSignalFlags.NONE,
+            on_signal,
         )
+        try:
+            GLib.MainLoop().run()
+        finally:
+            connection.signal_unsubscribe(subscription)
 
-    def install_extension(self, ext: AvailableExtension) -> bool:
+    def install_extension(self, ext: AvailableExtension, prepared: Any = None) -> bool:
         return (
             self.proxy_extensions.InstallRemoteExtension("(s)", ext.uuid)
             == "successful"
@@ -96,8 +143,10 @@ class DbusExtensionManager(ExtensionManager):
         self.proxy_extensions.LaunchExtensionPrefs("(s)", ext.uuid)
 
     def list_enabled_uuids(self) -> List[str]:
-        return list(self.settings["enabled-extensions"])
+        with span("enabled-list"):
+            return list(self.settings["enabled-extensions"])
 
     def set_enabled_uuids(self, uuids: List[str]) -> bool:
-        self.settings["enabled-extensions"] = uuids
+        with span("gsettings-write"):
+            self.settings["enabled-extensions"] = uuids
         return True
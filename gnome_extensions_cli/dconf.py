@@ -0,0 +1,225 @@
+"""
+gnome-extensions-cli
+"""
+
+import os
+import struct
+from os.path import expanduser
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ENABLED_EXTENSIONS_KEY = "/org/gnome/shell/enabled-extensions"
+SYSTEM_DATABASES = Path("/etc/dconf/db")
+
+_CACHE: Dict[Tuple[Path, str, str], Tuple[Tuple[int, int, int], Any]] = {}
+
+
+def user_database() -> Path:
+    """
+    Return the path of the user dconf database
+    """
+    return (
+        Path(os.getenv("XDG_CONFIG_HOME") or expanduser("~/.config")) / "dconf" / "user"
+    )
+
+
+def user_profile() -> Optional[Path]:
+    """
+    Return the path of the default dconf profile, None if there is none
+    """
+    data_dirs = os.getenv("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    for folder in ["/etc", *data_dirs.split(":")]:
+        path = Path(folder) / "dconf" / "profile" / "user"
+        if path.is_file():
+            return path
+    return None
+
+
+def system_databases(profile: Optional[Path] = None) -> List[Path]:
+    """
+    Return the read-only databases of a dconf profile, which may lock keys
+    """
+    if profile is None:
+        profile = user_profile()
+        if profile is None:
+            return []
+    try:
+        lines = profile.read_text().splitlines()
+    except OSError:
+        return []
+    out = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line.startswith("system-db:"):
+            out.append(SYSTEM_DATABASES / line[len("system-db:") :])
+        elif line.startswith("file-db:"):
+            out.append(Path(line[len("file-db:") :]))
+    return out
+
+
+def gvdb_hash(key: bytes) -> int:
+    """
+    Hash function used by GVDB (djb2 on signed chars)
+    """
+    out = 5381
+    for char in key:
+        out = (out * 33 + (char - 256 if char > 127 else char)) & 0xFFFFFFFF
+    return out
+
+
+class GvdbFile:
+    """
+    Minimal reader for GVDB files, the format of dconf databases
+    """
+
+    def __init__(self, data: bytes, table: Optional[Tuple[int, int]] = None):
+        if data[:8] == b"GVariant":
+            self.endian = "<"
+        elif data[:8] == b"raVGtnai":
+            self.endian = ">"
+        else:
+            raise ValueError("Invalid GVDB file")
+        self.data = data
+        start, end = table or self._unpack("II", 16)
+        self._load_table(start, end)
+
+    def _unpack(self, fmt: str, offset: int) -> tuple:
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def _load_table(self, start: int, end: int):
+        n_bloom_words, self.n_buckets = self._unpack("II", start)
+        n_bloom_words &= (1 << 27) - 1
+        self.buckets_start = start + 8 + n_bloom_words * 4
+        self.items_start = self.buckets_start + self.n_buckets * 4
+        self.n_items = (end - self.items_start) // 24
+
+    def _item(self, index: int) -> tuple:
+        # hash, parent, key_start, key_size, type, unused, value_start, value_end
+        return self._unpack("IIIHccII", self.items_start + index * 24)
+
+    def _check_key(self, item: tuple, key: bytes) -> bool:
+        _hash, parent, key_start, key_size = item[:4]
+        if not key.endswith(self.data[key_start : key_start + key_size]):
+            return False
+        key = key[: len(key) - key_size]
+        if parent == 0xFFFFFFFF:
+            return len(key) == 0
+        return parent < self.n_items and self._check_key(self._item(parent), key)
+
+    def _find(self, key: str, kind: bytes) -> Optional[tuple]:
+        if self.n_buckets == 0:
+            return None
+        encoded = key.encode()
+        hash_value = gvdb_hash(encoded)
+        bucket = hash_value % self.n_buckets
+        (index,) = self._unpack("I", self.buckets_start + bucket * 4)
+        last = (
+            self._unpack("I", self.buckets_start + (bucket + 1) * 4)[0]
+            if bucket < self.n_buckets - 1
+            else self.n_items
+        )
+        for itemno in range(index, min(last, self.n_items)):
+            item = self._item(itemno)
+            if (
+                item[0] == hash_value
+                and item[4] == kind
+                and self._check_key(item, encoded)
+            ):
+                return item
+        return None
+
+    def lookup(self, key: str) -> Optional[bytes]:
+        """
+        Return the raw serialized GVariant of the given key
+        """
+        item = self._find(key, b"v")
+        return None if item is None else self.data[item[6] : item[7]]
+
+    def table(self, key: str) -> Optional["GvdbFile"]:
+        """
+        Return the nested table of the given key
+        """
+        item = self._find(key, b"H")
+        return None if item is None else GvdbFile(self.data, (item[6], item[7]))
+
+    def is_locked(self, key: str) -> bool:
+        """
+        Tell if the key is in the .locks table of a dconf system database
+        """
+        locks = self.table(".locks")
+        return locks is not None and locks.lookup(key) is not None
+
+    def read_string_array(self, key: str) -> Optional[List[str]]:
+        """
+        Decode a value of type 'as', return None if not found or of another type
+        """
+        variant = self.lookup(key)
+        if variant is None:
+            return None
+        separator = variant.rfind(b"\0")
+        if separator < 0 or variant[separator + 1 :] != b"as":
+            return None
+        value = variant[:separator]
+        if len(value) == 0:
+            return []
+        offset_size = 1 if len(value) <= 0xFF else 2 if len(value) <= 0xFFFF else 4
+        offset_fmt = {1: "B", 2: "H", 4: "I"}[offset_size]
+
+        def read_offset(position: int) -> int:
+            # framing offsets are always little-endian
+            return struct.unpack_from("<" + offset_fmt, value, position)[0]
+
+        table_start = read_offset(len(value) - offset_size)
+        count = (len(value) - table_start) // offset_size
+        out = []
+        start = 0
+        for index in range(count):
+            end = read_offset(table_start + index * offset_size)
+            out.append(value[start:end].rstrip(b"\0").decode())
+            start = end
+        return out
+
+
+def _read_database(
+    database: Path, key: str, reader: Callable[[GvdbFile, str], Any]
+) -> Any:
+    """
+    Read a key from a database, the result is cached as long as the database is not
+    modified
+    """
+    try:
+        stat = database.stat()
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _CACHE.get((database, key, reader.__name__))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        value = reader(GvdbFile(database.read_bytes()), key)
+    except (OSError, ValueError, struct.error, UnicodeDecodeError):
+        value = None
+    _CACHE[(database, key, reader.__name__)] = (signature, value)
+    return value
+
+
+def read_string_array(
+    key: str, database: Optional[Path] = None, system: Optional[List[Path]] = None
+) -> Optional[List[str]]:
+    """
+    Read a string array from the user dconf database without any subprocess,
+    return None if the value cannot be read directly (missing key, custom profile,
+    key locked by a system database...) and should be read with gsettings instead
+    """
+    if os.getenv("DCONF_PROFILE") is not None:
+        # custom profile, values might come from other databases
+        return None
+    if os.getenv("GSETTINGS_BACKEND", "dconf") != "dconf":
+        # settings are not stored in dconf
+        return None
+    if system is None:
+        system = system_databases()
+    if any(_read_database(path, key, GvdbFile.is_locked) for path in system):
+        # the value set by the administrator overrides the user one
+        return None
+    return _read_database(database or user_database(), key, GvdbFile.read_string_array)
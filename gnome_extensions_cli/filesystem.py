@@ -2,23 +2,105 @@
 gnome-extensions-cli
 """
 
+import os
 import subprocess
 import sys
 from dataclasses import dataclass, field
+from enum import Enum
 from os.path import expanduser
 from pathlib import Path
-from re import finditer, fullmatch
+from re import finditer
 from shutil import rmtree
 from subprocess import DEVNULL, run
-from tempfile import NamedTemporaryFile
-from typing import List
-from urllib.request import urlopen
+from tempfile import NamedTemporaryFile, mkdtemp
+from typing import Any, List, Optional
 from zipfile import ZipFile
 
+from . import metrics
+from .cache import ArchiveCache, MetadataIndex
+from .dconf import ENABLED_EXTENSIONS_KEY, read_string_array, user_database
 from .icons import Color, Icons, Label
 from .manager import ExtensionManager
-from .schema import AvailableExtension, InstalledExtension
+from .schema import AvailableExtension, InstalledExtension, load_all
+from .shell import detect_shell_version
 from .store import GnomeExtensionStore
+from .timings import span
+
+
+def extract_archive(archive: Path, target_dir: Path, max_size: Optional[int] = None):
+    """
+    Extract a zip archive in one pass, checking the uncompressed size first
+    """
+    with ZipFile(archive) as zipfile:
+        size = sum(info.file_size for info in zipfile.infolist())
+        if max_size is not None and size > max_size:
+            raise ValueError(f"Archive content is too large ({size} bytes)")
+        zipfile.extractall(path=target_dir)
+
+
+def swap_folder(source: Path, target: Path):
+    """
+    Move source folder to target, replacing the existing target folder with renames
+    on the same filesystem. The previous target folder is kept until the new one is
+    in place and restored if the swap fails.
+    """
+    backup = source.with_name(source.name + ".old")
+    try:
+        target.rename(backup)
+    except FileNotFoundError:
+        # nothing to replace
+        backup = None
+    try:
+        source.rename(target)
+    except BaseException:
+        if backup is not None:
+            backup.rename(target)
+        raise
+    if backup is not None:
+        rmtree(backup, ignore_errors=True)
+
+
+class SchemaCompilation(Enum):
+    """
+    Result of the compilation of the schemas of an extension
+    """
+
+    NOT_NEEDED = "not needed"
+    COMPILED = "compiled"
+    UNAVAILABLE = "unavailable"
+    FAILED = "failed"
+
+    def report(self, extension_folder: Path):
+        """
+        Print the result for the installed extension folder
+        """
+        if self == SchemaCompilation.COMPILED:
+            print("Schemas compiled in", Label.folder(extension_folder))
+        elif self == SchemaCompilation.UNAVAILABLE:
+            print(
+                Icons.WARNING,
+                "Cannot compile schemas, you may need to manually compile schemas in",
+                Label.folder(extension_folder),
+            )
+        elif self == SchemaCompilation.FAILED:
+            print(
+                Icons.ERROR,
+                "Error while compiling schemas, you may need to manually compile schemas in",
+                Label.folder(extension_folder),
+            )
+
+
+@dataclass
+class PreparedExtension:
+    """
+    Extension extracted in the staging folder, ready to be installed
+    """
+
+    folder: Path
+    # cached archive the extension was extracted from, None if downloaded
+    archive: Optional[Path] = None
+    # printed once installed, prepare_extension runs on worker threads
+    schemas: Optional[SchemaCompilation] = None
 
 
 @dataclass
@@ -38,55 +120,126 @@ class FilesystemExtensionManager(ExtensionManager):
         ]
     )
     auto_compile_schemas: bool = True
+    max_archive_size: Optional[int] = 32 * 1024 * 1024
+    max_extracted_size: Optional[int] = 128 * 1024 * 1024
+    archive_cache: Optional[ArchiveCache] = None
+    metadata_index: Optional[MetadataIndex] = None
+    dconf_database: Optional[Path] = field(default_factory=user_database)
+    shell_version: Optional[str] = None
 
     def get_current_shell_version(self) -> str:
-        stdout = subprocess.check_output(
-            ["gnome-shell", "--version"],
-            text=True,
-        )
-        matcher = fullmatch(
-            r"GNOME Shell (?P<version>[0-9]+(?:\.[0-9]+)?)(?:\..+)?", stdout.strip()
-        )
-        assert matcher is not None, "Cannot retrieve Gnome Shell version"
-        return matcher.group("version")
+        if self.shell_version is None:
+            with span("shell-version"):
+                self.shell_version = detect_shell_version()
+        return self.shell_version
 
     def list_installed_extensions(self) -> List[InstalledExtension]:
-        out = {}
-        for folder in filter(Path.is_dir, self.system_folders + [self.user_folder]):
-            for subfolder in sorted(folder.iterdir()):
-                metadata_file = subfolder / "metadata.json"
-                if metadata_file.is_file():
-                    ext = InstalledExtension(subfolder)
-                    out[ext.uuid] = ext
-        return list(out.values())
-
-    def install_extension(self, ext: AvailableExtension) -> bool:
+        with span("installed-scan"):
+            candidates = []
+            for folder in self.system_folders + [self.user_folder]:
+                try:
+                    with os.scandir(folder) as iterator:
+                        subfolders = sorted(
+                            entry.path for entry in iterator if entry.is_dir()
+                        )
+                except OSError:
+                    continue
+                candidates += [InstalledExtension(Path(path)) for path in subfolders]
+            if self.metadata_index is not None:
+                extensions = self.metadata_index.load(candidates)
+                self.metadata_index.save()
+            else:
+                extensions = load_all(
+                    e for e in candidates if e.metadata_json.is_file()
+                )
+            # user extensions override system ones
+            return list({ext.uuid: ext for ext in extensions}.values())
+
+    @property
+    def staging_folder(self) -> Path:
+        """
+        Folder used to prepare extensions before installing them
+        """
+        return self.user_folder.parent / ".gnome-extensions-cli"
+
+    def prepare_extension(self, ext: AvailableExtension) -> PreparedExtension:
         assert ext.download_url is not None, (
             f"Cannot find recommended version for {ext.uuid}"
         )
-        if self.disable_uuids(ext.uuid):
-            print("Disable extension", ext.uuid)
-        target_dir = self.user_folder / ext.uuid
-        if target_dir.exists():
-            print("Remove existing folder:", Label.folder(target_dir))
-            rmtree(target_dir)
-        target_dir.mkdir(parents=True)
+        self.staging_folder.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(mkdtemp(prefix=f"{ext.uuid}.", dir=self.staging_folder))
         try:
-            with NamedTemporaryFile() as tmp:
-                print(
-                    "Download extensions from",
-                    Label.url(self.store.url, ext.download_url),
+            archive = (
+                self.archive_cache.get(ext.uuid, ext.version)
+                if self.archive_cache is not None and ext.version is not None
+                else None
+            )
+            if self.archive_cache is not None:
+                metrics.inc(
+                    "gext_cache_requests_total",
+                    cache="archive",
+                    result="hit" if archive is not None else "miss",
                 )
-                with urlopen(self.store.url + ext.download_url) as stream:
-                    tmp.write(stream.read())
-                tmp.seek(0)
-                print("Extract extension to", Label.folder(target_dir))
-                with ZipFile(tmp.name) as zipfile:
-                    for member in zipfile.namelist():
-                        zipfile.extract(member, path=target_dir)
+            if archive is not None:
+                with span("extraction", uuid=ext.uuid, cached=True):
+                    extract_archive(
+                        archive, staging_dir, max_size=self.max_extracted_size
+                    )
+            else:
+                with NamedTemporaryFile(dir=self.staging_folder) as tmp:
+                    with span("download", uuid=ext.uuid):
+                        digest = self.store.download(
+                            ext.download_url, tmp, max_size=self.max_archive_size
+                        )
+                    tmp.flush()
+                    with span("extraction", uuid=ext.uuid):
+                        extract_archive(
+                            Path(tmp.name),
+                            staging_dir,
+                            max_size=self.max_extracted_size,
+                        )
+                    if self.archive_cache is not None and ext.version is not None:
+                        self.archive_cache.put(
+                            ext.uuid, ext.version, Path(tmp.name), digest
+                        )
+            schemas: Optional[SchemaCompilation] = None
             if self.auto_compile_schemas:
-                self.compile_schemas(target_dir)
-            if self.enable_uuids(ext.uuid):
+                with span("schema-compilation", uuid=ext.uuid):
+                    schemas = self.compile_schemas(staging_dir)
+        except BaseException:
+            rmtree(staging_dir, ignore_errors=True)
+            raise
+        return PreparedExtension(staging_dir, archive, schemas)
+
+    def discard_extension(self, prepared: Any):
+        if isinstance(prepared, PreparedExtension):
+            rmtree(prepared.folder, ignore_errors=True)
+
+    def install_extension(self, ext: AvailableExtension, prepared: Any = None) -> bool:
+        target_dir = self.user_folder / ext.uuid
+        was_enabled = False
+        try:
+            if prepared is None:
+                prepared = self.prepare_extension(ext)
+            if self.disable_uuids(ext.uuid):
+                was_enabled = True
+                if self._transaction is None:
+                    print("Disable extension", ext.uuid)
+            print(
+                "Install extension from",
+                (
+                    Label.file(prepared.archive)
+                    if prepared.archive is not None
+                    else Label.url(self.store.endpoint, ext.download_url)
+                ),
+                "to",
+                Label.folder(target_dir),
+            )
+            self.user_folder.mkdir(parents=True, exist_ok=True)
+            swap_folder(prepared.folder, target_dir)
+            if prepared.schemas is not None:
+                prepared.schemas.report(target_dir)
+            if self.enable_uuids(ext.uuid) and self._transaction is None:
                 print(
                     "Enable extension", Label.installed(InstalledExtension(target_dir))
                 )
@@ -97,8 +250,10 @@ class FilesystemExtensionManager(ExtensionManager):
                 Color.RED(error),
                 file=sys.stderr,
             )
-            print("Remove temporary folder:", Label.folder(target_dir))
-            rmtree(target_dir)
+            self.discard_extension(prepared)
+            if was_enabled and target_dir.exists():
+                # previous version is still installed
+                self.enable_uuids(ext.uuid)
             return False
         return True
 
@@ -113,12 +268,18 @@ class FilesystemExtensionManager(ExtensionManager):
         self._run(["gnome-extensions-app"])
 
     def list_enabled_uuids(self) -> List[str]:
-        stdout = subprocess.check_output(
-            ["gsettings", "get", "org.gnome.shell", "enabled-extensions"],
-            text=True,
-        )
-        uuids = [m.group("uuid") for m in finditer(r"'(?P<uuid>[^']+)'", stdout)]
-        return uuids
+        with span("enabled-list"):
+            if self.dconf_database is not None:
+                # read dconf database directly to avoid a subprocess
+                uuids = read_string_array(ENABLED_EXTENSIONS_KEY, self.dconf_database)
+                if uuids is not None:
+                    return uuids
+            stdout = subprocess.check_output(
+                ["gsettings", "get", "org.gnome.shell", "enabled-extensions"],
+                text=True,
+            )
+            uuids = [m.group("uuid") for m in finditer(r"'(?P<uuid>[^']+)'", stdout)]
+            return uuids
 
     def set_enabled_uuids(self, uuids: List[str]) -> bool:
         uuids_text = ",".join((f'"{uuid}"' for uuid in uuids))
@@ -129,7 +290,9 @@ class FilesystemExtensionManager(ExtensionManager):
             "enabled-extensions",
             f"[{uuids_text}]",
         ]
-        if self._run(command) != 0:
+        with span("gsettings-write"):
+            code = self._run(command)
+        if code != 0:
             print(
                 Icons.WARNING,
                 f"Error while enable extensions with {Color.YELLOW('gesttings')}",
@@ -138,6 +301,9 @@ class FilesystemExtensionManager(ExtensionManager):
             return False
         return self.restart_gnome_shell()
 
+    def restart_shell(self) -> bool:
+        return self.restart_gnome_shell()
+
     def restart_gnome_shell(self) -> bool:
         """
         Manually restart Gnome Shell
@@ -151,7 +317,9 @@ class FilesystemExtensionManager(ExtensionManager):
             "org.gnome.Shell.Eval",
             'string:"global.reexec_self();"',
         ]
-        if self._run(command) != 0:
+        with span("shell-restart"):
+            code = self._run(command)
+        if code != 0:
             print(
                 Icons.WARNING,
                 "Could not restart Gnome Shell, you have to restart it manually",
@@ -172,16 +340,16 @@ class FilesystemExtensionManager(ExtensionManager):
         )
         return process.returncode
 
-    def compile_schemas(self, extension_folder: Path) -> bool:
+    def compile_schemas(self, extension_folder: Path) -> SchemaCompilation:
         if not (schemas_folder := extension_folder / "schemas").exists():
             # No schemas to compile
-            return True
+            return SchemaCompilation.NOT_NEEDED
         if (schemas_folder / "gschemas.compiled").exists():
             # Schemas already compiled
-            return True
+            return SchemaCompilation.NOT_NEEDED
         if len(list(schemas_folder.glob("*.gschema.xml"))) == 0:
             # Folder exists, no schemas to compile
-            return True
+            return SchemaCompilation.NOT_NEEDED
 
         # Check if glib-compile-schemas is available
         try:
@@ -192,12 +360,7 @@ class FilesystemExtensionManager(ExtensionManager):
                 stderr=DEVNULL,
             )
         except BaseException:
-            print(
-                Icons.WARNING,
-                "Cannot compile schemas, you may need to manually compile schemas in",
-                Label.folder(extension_folder),
-            )
-            return False
+            return SchemaCompilation.UNAVAILABLE
 
         process = run(
             ["glib-compile-schemas", "schemas/"],
@@ -207,12 +370,5 @@ class FilesystemExtensionManager(ExtensionManager):
             stderr=DEVNULL,
         )
         if process.returncode != 0:
-            print(
-                Icons.ERROR,
-                "Error while compiling schemas, you may need to manually compile schemas in",
-                Label.folder(extension_folder),
-            )
-            return False
-
-        print("Schemas compiled in", Label.folder(extension_folder))
-        return True
+            return SchemaCompilation.FAILED
+        return SchemaCompilation.COMPILED
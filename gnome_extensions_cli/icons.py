@@ -4,11 +4,12 @@ gnome-extensions-cli
 
 from enum import Enum
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from colorama import Back, Fore, Style
 
-from .schema import AvailableExtension, InstalledExtension
+if TYPE_CHECKING:
+    from .schema import AvailableExtension, InstalledExtension
 
 
 class Icons(Enum):
@@ -31,6 +32,7 @@ class Icons(Enum):
     PACKAGE = "📦"
     THUMB_UP = "👍"
     TRASH = "🗑"
+    TIMER = "⏱"
 
     def __str__(self):
         return self.value
@@ -109,7 +111,7 @@ class Label:
         return Color.BLUE(base + path) if path is not None else None
 
     @staticmethod
-    def available(ext: AvailableExtension) -> str:
+    def available(ext: "AvailableExtension") -> str:
         return " ".join(
             filter(
                 None,
@@ -122,7 +124,7 @@ class Label:
         )
 
     @staticmethod
-    def installed(ext: InstalledExtension, enabled: Optional[bool] = None) -> str:
+    def installed(ext: "InstalledExtension", enabled: Optional[bool] = None) -> str:
         name = ext.metadata.name
         if enabled is True:
             name = Color.DEFAULT(name, style="bright")
@@ -136,3 +138,7 @@ class Label:
     @staticmethod
     def folder(path: Path) -> str:
         return Color.BLUE(f"{path}/", style="bright")
+
+    @staticmethod
+    def file(path: Path) -> str:
+        return Color.BLUE(str(path), style="bright")
@@ -3,17 +3,32 @@ gnome-extensions-cli
 """
 
 from abc import ABC, abstractmethod
-from typing import List
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Set
 
 from .schema import AvailableExtension, InstalledExtension
 
 
+@dataclass
+class Transaction:
+    """
+    Pending changes of enabled extensions
+    """
+
+    initial_uuids: Set[str]
+    enabled_uuids: Set[str]
+    changed: bool = False
+
+
 class ExtensionManager(ABC):
     """
     Abstract class to manipulate extensions
 
     """
 
+    _transaction: Optional[Transaction] = None
+
     @abstractmethod
     def get_current_shell_version(self) -> str:
         """
@@ -26,10 +41,25 @@ class ExtensionManager(ABC):
         List installed extensions
         """
 
+    def prepare_extension(
+        self, ext: AvailableExtension  # pylint: disable=unused-argument
+    ) -> Any:
+        """
+        Prepare the installation of given extension (download, extract...).
+        This step can run concurrently for several extensions, the returned value
+        is given to install_extension
+        """
+        return None
+
+    def discard_extension(self, prepared: Any):
+        """
+        Clean a prepared extension which will not be installed
+        """
+
     @abstractmethod
-    def install_extension(self, ext: AvailableExtension) -> bool:
+    def install_extension(self, ext: AvailableExtension, prepared: Any = None) -> bool:
         """
-        Install given extension
+        Install given extension, using the result of prepare_extension if given
         """
 
     @abstractmethod
@@ -56,18 +86,62 @@ class ExtensionManager(ABC):
         Set enabled extensions uuids
         """
 
-    def enable_uuids(self, *uuids: str) -> bool:
+    def restart_shell(self) -> bool:
         """
-        Enable given extensions
+        Restart Gnome Shell if needed to apply changes made to extensions
         """
+        return True
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Collect enable/disable changes and apply them at once when leaving the context:
+        enabled extensions are written once and Gnome Shell is restarted at most once.
+        Changes are printed when applied
+        """
+        if self._transaction is not None:
+            # already in a transaction
+            yield
+            return
+        uuids = set(self.list_enabled_uuids())
+        self._transaction = Transaction(initial_uuids=uuids, enabled_uuids=set(uuids))
+        try:
+            yield
+        finally:
+            transaction, self._transaction = self._transaction, None
+            if transaction.enabled_uuids != transaction.initial_uuids:
+                # changes are only applied now
+                initial, enabled = transaction.initial_uuids, transaction.enabled_uuids
+                for uuid in sorted(initial - enabled):
+                    print("Disable extension", uuid)
+                for uuid in sorted(enabled - initial):
+                    print("Enable extension", uuid)
+                self.set_enabled_uuids(list(transaction.enabled_uuids))
+            elif transaction.changed:
+                # extensions were disabled then enabled again, during an update
+                self.restart_shell()
+
+    def _change_enabled_uuids(self, added: Set[str], removed: Set[str]) -> bool:
+        if self._transaction is not None:
+            old_uuids = self._transaction.enabled_uuids
+            new_uuids = (old_uuids | added) - removed
+            if old_uuids == new_uuids:
+                return False
+            self._transaction.enabled_uuids = new_uuids
+            self._transaction.changed = True
+            return True
         old_uuids = set(self.list_enabled_uuids())
-        new_uuids = old_uuids | set(uuids)
+        new_uuids = (old_uuids | added) - removed
         return old_uuids != new_uuids and self.set_enabled_uuids(list(new_uuids))
 
+    def enable_uuids(self, *uuids: str) -> bool:
+        """
+        Enable given extensions
+        """
+        return self._change_enabled_uuids(set(uuids), set())
+
     def disable_uuids(self, *uuids: str) -> bool:
         """
         Disable given extensions
         """
-        old_uuids = set(self.list_enabled_uuids())
-        new_uuids = old_uuids - set(uuids)
-        return old_uuids != new_uuids and self.set_enabled_uuids(list(new_uuids))
+        return self._change_enabled_uuids(set(), set(uuids))
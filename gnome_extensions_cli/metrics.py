@@ -0,0 +1,217 @@
+"""
+gnome-extensions-cli
+"""
+
+import os
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .timings import Recorder
+
+# name: (type, help) of exported metrics
+METRICS: Dict[str, Tuple[str, str]] = {
+    "gext_last_run_timestamp_seconds": (
+        "gauge",
+        "Time when the command finished, in seconds since the epoch",
+    ),
+    "gext_last_run_exit_code": ("gauge", "Exit code of the command"),
+    "gext_run_duration_seconds": ("gauge", "Duration of the command"),
+    "gext_phase_duration_seconds": (
+        "gauge",
+        "Total time spent in each phase, concurrent phases overlap",
+    ),
+    "gext_phase_calls": ("gauge", "Number of times each phase ran"),
+    "gext_update_extensions": (
+        "gauge",
+        "Extensions checked, outdated, updated, installed, failed or not found",
+    ),
+    "gext_http_requests_total": ("counter", "HTTP requests sent to the store"),
+    "gext_http_request_duration_seconds": (
+        "histogram",
+        "Time until the response headers of store requests are received",
+    ),
+    "gext_downloaded_bytes_total": (
+        "counter",
+        "Bytes of extension archives downloaded",
+    ),
+    "gext_cache_requests_total": ("counter", "Cache lookups by result"),
+    "gext_cache_hit_ratio": (
+        "gauge",
+        "Ratio of cache lookups answered without downloading anything",
+    ),
+}
+
+# default buckets of Prometheus clients, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CACHE_HITS = ("hit", "revalidated")
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: LabelSet) -> str:
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+@dataclass
+class Histogram:
+    counts: List[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    total: float = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+
+
+@dataclass
+class Registry:
+    """
+    Metrics of the running command, written in the Prometheus text format for the
+    node exporter textfile collector
+    """
+
+    labels: Dict[str, str] = field(default_factory=dict)
+    values: Dict[Tuple[str, LabelSet], float] = field(default_factory=dict)
+    histograms: Dict[Tuple[str, LabelSet], Histogram] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+    def _key(self, name: str, labels: Dict[str, str]) -> Tuple[str, LabelSet]:
+        assert name in METRICS, f"Unknown metric {name}"
+        return name, tuple({**self.labels, **labels}.items())
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = self._key(name, labels)
+        with self.lock:
+            self.histograms.setdefault(key, Histogram()).observe(value)
+
+    def record_run(self, exit_code: int, recorder: Optional["Recorder"] = None):
+        """
+        Add the metrics known once the command is finished
+        """
+        self.set("gext_last_run_timestamp_seconds", round(time.time(), 3))
+        self.set("gext_last_run_exit_code", exit_code)
+        if recorder is not None:
+            self.set("gext_run_duration_seconds", round(recorder.elapsed(), 6))
+            for phase, count, total, _longest in recorder.report():
+                self.set("gext_phase_duration_seconds", round(total, 6), phase=phase)
+                self.set("gext_phase_calls", count, phase=phase)
+        lookups: Dict[str, Tuple[float, float]] = {}
+        for (name, labels), value in list(self.values.items()):
+            if name == "gext_cache_requests_total":
+                cache = dict(labels)["cache"]
+                hits, total = lookups.get(cache, (0, 0))
+                if dict(labels)["result"] in CACHE_HITS:
+                    hits += value
+                lookups[cache] = (hits, total + value)
+        for cache, (hits, total) in lookups.items():
+            self.set("gext_cache_hit_ratio", round(hits / total, 6), cache=cache)
+
+    def render(self) -> str:
+        lines = []
+        samples: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(self.values.items()):
+            samples.setdefault(name, []).append(
+                f"{name}{format_labels(labels)} {format_value(value)}"
+            )
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                samples.setdefault(name, []).append(
+                    f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}"
+                )
+            samples[name].append(
+                f"{name}_sum{format_labels(labels)} {format_value(histogram.total)}"
+            )
+            samples[name].append(f"{name}_count{format_labels(labels)} {cumulative}")
+        for name, (kind, help_) in METRICS.items():
+            if name in samples:
+                lines.append(f"# HELP {name} {help_}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines += samples[name]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path):
+        """
+        Write the metrics atomically, so the collector never reads a partial file
+        """
+        with NamedTemporaryFile(
+            "w", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        ) as tmp:
+            try:
+                tmp.write(self.render())
+                tmp.close()
+                os.chmod(tmp.name, 0o644)
+                os.replace(tmp.name, path)
+            except BaseException:
+                # do not leave partial files for the collector to skip forever
+                os.unlink(tmp.name)
+                raise
+
+
+_REGISTRY: Optional[Registry] = None
+
+
+def start_collecting(**labels: str) -> Registry:
+    """
+    Start collecting metrics for the current process
+    """
+    global _REGISTRY  # pylint: disable=global-statement
+    _REGISTRY = Registry(labels=labels)
+    return _REGISTRY
+
+
+def stop_collecting() -> Optional[Registry]:
+    global _REGISTRY  # pylint: disable=global-statement
+    out, _REGISTRY = _REGISTRY, None
+    return out
+
+
+def inc(name: str, value: float = 1, **labels: str):
+    """
+    Increment a counter, does nothing when not collecting
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.inc(name, value, **labels)
+
+
+def set_value(name: str, value: float, **labels: str):
+    """
+    Set a gauge, does nothing when not collecting
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str):
+    """
+    Add an observation to a histogram, does nothing when not collecting
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.observe(name, value, **labels)
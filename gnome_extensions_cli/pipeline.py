@@ -0,0 +1,77 @@
+"""
+gnome-extensions-cli
+"""
+
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from .icons import Color, Icons
+from .manager import ExtensionManager
+from .schema import AvailableExtension
+from .timings import span
+
+
+@dataclass
+class InstallPipeline:
+    """
+    Prepare extensions (download, extraction...) concurrently as soon as they are
+    submitted, only the final installation step is serialized
+    """
+
+    manager: ExtensionManager
+    max_workers: int = 4
+    executor: ThreadPoolExecutor = field(init=False)
+    jobs: Dict[str, Future] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def submit(self, ext: AvailableExtension):
+        """
+        Start preparing the given extension, if not already submitted
+        """
+        if ext.uuid not in self.jobs:
+            self.jobs[ext.uuid] = self.executor.submit(self.prepare, ext)
+
+    def prepare(self, ext: AvailableExtension) -> Any:
+        with span("prepare", uuid=ext.uuid):
+            return self.manager.prepare_extension(ext)
+
+    def install(self, ext: AvailableExtension) -> bool:
+        """
+        Wait for the given extension to be prepared, then install it
+        """
+        self.submit(ext)
+        job = self.jobs.pop(ext.uuid)
+        try:
+            prepared = job.result()
+        except BaseException as error:  # pylint: disable=broad-except
+            print(
+                Icons.BOOM,
+                f"Error while installing {ext.uuid}:",
+                Color.RED(error),
+                file=sys.stderr,
+            )
+            return False
+        with span("install", uuid=ext.uuid):
+            return self.manager.install_extension(ext, prepared)
+
+    def close(self):
+        """
+        Cancel pending jobs and discard prepared extensions which were not installed
+        """
+        for job in self.jobs.values():
+            job.cancel()
+        self.executor.shutdown(wait=True)
+        for job in self.jobs.values():
+            if not job.cancelled() and job.exception() is None:
+                self.manager.discard_extension(job.result())
+        self.jobs.clear()
@@ -3,13 +3,17 @@ gnome-extensions-cli
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from enum import IntEnum
 from functools import cached_property
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 from pydantic import BaseModel, Field
 
+from .utils import VersionKey, version_key
+
 
 class Metadata(BaseModel):
     uuid: str
@@ -21,6 +25,11 @@ class Metadata(BaseModel):
     version: Optional[Union[str, int, float]] = None
     path: Optional[Path] = None
 
+    @property
+    def version_key(self) -> VersionKey:
+        # not cached on the model, model_copy() could change the version
+        return version_key(self.version)
+
 
 class _Version(BaseModel):
     pk: int
@@ -42,6 +51,11 @@ class AvailableExtension(BaseModel):
     version_tag: Optional[int] = None
     download_url: Optional[str] = None
 
+    @property
+    def version_key(self) -> VersionKey:
+        # not cached on the model, model_copy() could change the version
+        return version_key(self.version)
+
 
 class Search(BaseModel):
     extensions: List[AvailableExtension]
@@ -49,22 +63,96 @@ class Search(BaseModel):
     numpages: int
 
 
+class ExtensionState(IntEnum):
+    """
+    State of an extension, as reported by Gnome Shell
+    """
+
+    ENABLED = 1
+    DISABLED = 2
+    ERROR = 3
+    OUT_OF_DATE = 4
+    DOWNLOADING = 5
+    INITIALIZED = 6
+    DISABLING = 7
+    ENABLING = 8
+    UNINSTALLED = 99
+
+
 @dataclass
 class InstalledExtension:
     folder: Path
+    state: Optional[ExtensionState] = None
 
     @property
     def metadata_json(self) -> Path:
         return self.folder / "metadata.json"
 
-    @property
-    def read_only(self):
+    @cached_property
+    def read_only(self) -> bool:
         return not os.access(str(self.folder), os.W_OK)
 
+    @classmethod
+    def from_metadata(
+        cls, folder: Path, metadata: Metadata, state: Optional[ExtensionState] = None
+    ) -> "InstalledExtension":
+        """
+        Create an installed extension with already loaded metadata
+        """
+        out = cls(folder, state)
+        out.__dict__["metadata"] = metadata
+        return out
+
+    @classmethod
+    def from_dbus(cls, info: Dict[str, Any]) -> "InstalledExtension":
+        """
+        Create an installed extension from an item of the ListExtensions DBus reply,
+        which already contains the metadata so the metadata file is never read
+        """
+        # numbers are sent as doubles
+        info = {
+            key: (
+                int(value) if isinstance(value, float) and value.is_integer() else value
+            )
+            for key, value in info.items()
+        }
+        try:
+            state = ExtensionState(info.get("state"))
+        except ValueError:
+            state = None
+        out = cls.from_metadata(
+            Path(info["path"]), Metadata.model_validate(info), state
+        )
+        if info.get("type") in (1, 2):
+            # system or per-user extension, no need to check the folder
+            out.__dict__["read_only"] = info["type"] == 1
+        return out
+
     @cached_property
     def metadata(self) -> Metadata:
-        return Metadata.model_validate_json(self.metadata_json.read_text())
+        # validate raw bytes, pydantic parses JSON without decoding to str first
+        return Metadata.model_validate_json(self.metadata_json.read_bytes())
 
     @property
     def uuid(self) -> str:
         return self.metadata.uuid
+
+
+def load_all(
+    extensions: Iterable[InstalledExtension], max_workers: Optional[int] = None
+) -> List[InstalledExtension]:
+    """
+    Load the metadata of all given extensions, reading files concurrently
+    """
+    out = list(extensions)
+    pending = [ext for ext in out if "metadata" not in ext.__dict__]
+    if len(pending) > 8:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for ext, metadata in zip(
+                pending, executor.map(lambda e: e.metadata, pending)
+            ):
+                ext.__dict__["metadata"] = metadata
+    else:
+        for ext in pending:
+            _ = ext.metadata
+    return out
@@ -0,0 +1,89 @@
+"""
+gnome-extensions-cli
+"""
+
+import json
+import os
+import subprocess
+from pathlib import Path
+from re import fullmatch, search
+from shutil import which
+from typing import Optional
+
+from .cache import cache_folder
+
+GNOME_VERSION_FILE = Path("/usr/share/gnome/gnome-version.xml")
+
+
+def parse_shell_version(text: str) -> str:
+    """
+    Parse the output of gnome-shell --version
+    """
+    matcher = fullmatch(
+        r"GNOME Shell (?P<version>[0-9]+(?:\.[0-9]+)?)(?:\..+)?", text.strip()
+    )
+    assert matcher is not None, "Cannot retrieve Gnome Shell version"
+    return matcher.group("version")
+
+
+def read_gnome_version_file(path: Path = GNOME_VERSION_FILE) -> Optional[str]:
+    """
+    Read the Gnome platform version from the gnome-desktop data files, which may
+    differ from the Gnome Shell version
+    """
+    try:
+        content = path.read_text()
+    except OSError:
+        return None
+    platform = search(r"<platform>\s*([0-9]+)\s*</platform>", content)
+    minor = search(r"<minor>\s*([0-9]+)\s*</minor>", content)
+    if platform is None or minor is None:
+        return None
+    return f"{platform.group(1)}.{minor.group(1)}"
+
+
+def detect_shell_version(
+    cache_file: Optional[Path] = None, version_file: Path = GNOME_VERSION_FILE
+) -> str:
+    """
+    Detect the installed Gnome Shell version with gnome-shell --version. The result
+    is cached on disk and invalidated when the gnome-shell binary changes, so the
+    binary only runs once per upgrade. The Gnome platform version is only used when
+    gnome-shell cannot be run.
+    """
+    if cache_file is None:
+        cache_file = cache_folder() / "shell-version.json"
+    binary = which("gnome-shell")
+    stat = None
+    if binary is not None:
+        try:
+            stat = os.stat(binary)
+        except OSError:
+            # broken symlink or unreadable binary, use the platform version
+            pass
+    if binary is not None and stat is not None:
+        key = [binary, stat.st_size, stat.st_mtime_ns]
+        try:
+            cached = json.loads(cache_file.read_text())
+            if cached.get("key") == key:
+                return cached["version"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        try:
+            version = parse_shell_version(
+                subprocess.check_output(
+                    [binary, "--version"], text=True, stderr=subprocess.DEVNULL
+                )
+            )
+        except (AssertionError, OSError, subprocess.SubprocessError):
+            pass
+        else:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(json.dumps({"key": key, "version": version}))
+            except OSError:
+                pass
+            return version
+    version = read_gnome_version_file(version_file)
+    assert version is not None, "Cannot retrieve Gnome Shell version"
+    return version
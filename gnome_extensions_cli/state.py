@@ -0,0 +1,97 @@
+"""
+gnome-extensions-cli
+"""
+
+from typing import Dict, FrozenSet, Iterator, List, Optional, Union
+
+from .manager import ExtensionManager
+from .schema import AvailableExtension, InstalledExtension, load_all
+
+
+class ExtensionEntry:
+    """
+    An installed extension with its precomputed flags
+    """
+
+    __slots__ = ("extension", "uuid", "pk", "enabled")
+
+    def __init__(self, extension: InstalledExtension, enabled: bool):
+        self.extension = extension
+        self.uuid = extension.uuid
+        self.pk: Optional[int] = None
+        self.enabled = enabled
+
+    @property
+    def read_only(self) -> bool:
+        # checked on first use only, it needs a system call per extension
+        return self.extension.read_only
+
+    @property
+    def user(self) -> bool:
+        return not self.read_only
+
+
+class StateSnapshot:
+    """
+    Installed extensions, enabled uuids and shell version, loaded once per command
+    and indexed by uuid and pk
+    """
+
+    __slots__ = ("entries", "by_uuid", "by_pk", "enabled_uuids", "shell_version")
+
+    def __init__(
+        self,
+        extensions: List[InstalledExtension],
+        enabled_uuids: FrozenSet[str],
+        shell_version: Optional[str] = None,
+    ):
+        self.enabled_uuids = enabled_uuids
+        self.shell_version = shell_version
+        self.by_uuid: Dict[str, ExtensionEntry] = {}
+        for ext in extensions:
+            self.by_uuid[ext.uuid] = ExtensionEntry(ext, ext.uuid in enabled_uuids)
+        self.entries = sorted(self.by_uuid.values(), key=lambda e: e.uuid.lower())
+        self.by_pk: Dict[int, ExtensionEntry] = {}
+
+    @classmethod
+    def load(
+        cls, manager: ExtensionManager, shell_version: bool = True
+    ) -> "StateSnapshot":
+        """
+        Load the state of installed extensions from the manager
+        """
+        return cls(
+            load_all(manager.list_installed_extensions()),
+            frozenset(manager.list_enabled_uuids()),
+            manager.get_current_shell_version() if shell_version else None,
+        )
+
+    def __iter__(self) -> Iterator[ExtensionEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.by_uuid
+
+    def get(self, uuid_or_pk: Union[str, int]) -> Optional[ExtensionEntry]:
+        """
+        Find an installed extension by its uuid, or by its pk once known
+        """
+        if isinstance(uuid_or_pk, int) or uuid_or_pk.isnumeric():
+            return self.by_pk.get(int(uuid_or_pk))
+        return self.by_uuid.get(uuid_or_pk)
+
+    def attach(self, available_ext: AvailableExtension) -> Optional[ExtensionEntry]:
+        """
+        Record the pk of an installed extension from its available counterpart
+        """
+        entry = self.by_uuid.get(available_ext.uuid)
+        if entry is not None:
+            entry.pk = available_ext.pk
+            self.by_pk[available_ext.pk] = entry
+        return entry
+
+    def is_enabled(self, uuid: str) -> bool:
+        return uuid in self.enabled_uuids
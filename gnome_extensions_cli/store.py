@@ -2,15 +2,40 @@
 gnome-extensions-cli
 """
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
-from typing import Iterable, Optional, Tuple, Union
-
-from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+from functools import cached_property
+from hashlib import sha256
+from itertools import islice
+from math import ceil
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlencode
 
+from . import metrics
+from .cache import CacheEntry, StoreCache
+from .config import DEFAULT_STORE_URL
 from .schema import AvailableExtension, Search
+from .timings import span
+
+if TYPE_CHECKING:
+    from requests import Response, Session
+
+CHUNK_SIZE = 64 * 1024
 
 
 @dataclass
@@ -19,20 +44,174 @@ class GnomeExtensionStore:
     Interface to search for extensions on Gnome Website
     """
 
-    url: str = "https://extensions.gnome.org"
+    url: str = DEFAULT_STORE_URL
+    mirrors: List[str] = field(default_factory=list)
     timeout: int = 20
-    session: Session = field(init=False)
-
-    def __post_init__(self):
-        self.session = Session()
-        self.session.mount(
-            "https://",
-            HTTPAdapter(
-                max_retries=Retry(
-                    total=2, backoff_factor=1, status_forcelist=[500, 502, 503, 504]
-                )
+    probe_timeout: float = 3
+    max_workers: int = 8
+    cache: Optional[StoreCache] = None
+    lock: Lock = field(default_factory=Lock, init=False, repr=False, compare=False)
+
+    @cached_property
+    def session(self) -> "Session":
+        """
+        HTTP session, created on first use so commands which do not contact the
+        store do not have to import requests
+        """
+        # pylint: disable=import-outside-toplevel
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import Retry
+
+        session = Session()
+        # a single adapter shared by metadata lookups and downloads, with a pool
+        # large enough for all workers to reuse their connection, with mirrors
+        # failing requests are sent to the next endpoint instead of retried
+        adapter = HTTPAdapter(
+            pool_maxsize=self.max_workers,
+            max_retries=(
+                Retry(total=2, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+                if len(self.mirrors) == 0
+                else 0
             ),
         )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def endpoints_key(self) -> str:
+        return "endpoints:" + " ".join(dict.fromkeys([self.url] + self.mirrors))
+
+    @cached_property
+    def endpoints(self) -> List[str]:
+        """
+        Store url and mirrors, ranked by latency when mirrors are configured.
+        The ranking is kept in the cache
+        """
+        candidates = list(dict.fromkeys([self.url] + self.mirrors))
+        if len(candidates) == 1:
+            return candidates
+        entry = self.cache.get(self.endpoints_key) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry) and entry.body:
+            ranked = json.loads(entry.body)
+            if sorted(ranked) == sorted(candidates):
+                return ranked
+        with span("store-probe"):
+            ranked = self.rank_endpoints(candidates)
+        self._save_endpoints(ranked)
+        return ranked
+
+    @property
+    def endpoint(self) -> str:
+        """
+        Endpoint which answers requests, the store url until endpoints are ranked
+        """
+        with self.lock:
+            # do not probe mirrors only to print a link
+            endpoints = self.__dict__.get("endpoints")
+            return endpoints[0] if endpoints else self.url
+
+    def probe(self, endpoint: str) -> Optional[float]:
+        """
+        Check an endpoint, return its latency in seconds or None if it is not
+        available
+        """
+        # pylint: disable=import-outside-toplevel
+        from requests import RequestException
+
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(
+                f"{endpoint}/extension-info/",
+                params={"pk": "1"},
+                timeout=self.probe_timeout,
+            )
+            resp.close()
+        except RequestException:
+            return None
+        if resp.status_code >= 500:
+            return None
+        return time.perf_counter() - start
+
+    def rank_endpoints(self, candidates: List[str]) -> List[str]:
+        """
+        Probe endpoints in parallel, sort available ones by latency then keep
+        unavailable ones as last resort, in configuration order
+        """
+        with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+            latencies = list(executor.map(self.probe, candidates))
+        available = sorted(
+            (latency, index)
+            for index, latency in enumerate(latencies)
+            if latency is not None
+        )
+        return [candidates[index] for _latency, index in available] + [
+            url for url, latency in zip(candidates, latencies) if latency is None
+        ]
+
+    def _save_endpoints(self, ranked: List[str]):
+        if self.cache is not None:
+            self.cache.put(
+                self.endpoints_key,
+                CacheEntry(timestamp=time.time(), status=200, body=json.dumps(ranked)),
+            )
+
+    def demote(self, endpoint: str):
+        """
+        Move a failing endpoint after the others
+        """
+        with self.lock:
+            if self.endpoints[-1] != endpoint:
+                self.endpoints.remove(endpoint)
+                self.endpoints.append(endpoint)
+                self._save_endpoints(self.endpoints)
+
+    def _get(self, path: str, **kwargs) -> "Response":
+        """
+        GET a path from the first available endpoint, endpoints failing with a
+        connection error or a server error are demoted and the next one is used
+        """
+        # pylint: disable=import-outside-toplevel
+        from requests import ConnectionError as RequestsConnectionError
+        from requests import Timeout
+
+        with self.lock:
+            # endpoints are ranked once, by the first worker
+            endpoints = list(self.endpoints)
+        for endpoint in endpoints[:-1]:
+            try:
+                resp = self._request(endpoint, path, **kwargs)
+                if resp.status_code < 500:
+                    return resp
+                resp.close()
+            except (RequestsConnectionError, Timeout):
+                pass
+            self.demote(endpoint)
+        return self._request(endpoints[-1], path, **kwargs)
+
+    def _request(self, endpoint: str, path: str, **kwargs) -> "Response":
+        """
+        Send a GET request to an endpoint, recording its status and latency
+        """
+        # low cardinality label: /extension-info/, /download-extension/...
+        resource = "/" + path.split("?")[0].strip("/").split("/")[0] + "/"
+        start = time.perf_counter()
+        code = "error"
+        try:
+            resp = self.session.get(f"{endpoint}{path}", timeout=self.timeout, **kwargs)
+            code = str(resp.status_code)
+            return resp
+        finally:
+            metrics.observe(
+                "gext_http_request_duration_seconds",
+                time.perf_counter() - start,
+                endpoint=endpoint,
+                path=resource,
+            )
+            metrics.inc(
+                "gext_http_requests_total", endpoint=endpoint, path=resource, code=code
+            )
 
     def iter_fetch(
         self,
@@ -42,15 +221,62 @@ class GnomeExtensionStore:
     ) -> Iterable[Tuple[Union[str, int], Optional[AvailableExtension]]]:
         """
         Fetch multiple available extensions in parallel and yield when fetched
+
+        At most max_workers lookups are running at the same time, extensions are
+        consumed from the given iterable when a worker is available and pending
+        lookups are cancelled if the iteration is stopped
+        """
+        workers = max_workers or self.max_workers
+        remaining = iter(extensions)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            jobs = {}
+
+            def submit(count: int):
+                for ext in islice(remaining, count):
+                    jobs[executor.submit(self.find, ext, shell_version)] = ext
+
+            submit(workers)
+            try:
+                while len(jobs) > 0:
+                    done, _ = wait(jobs.keys(), return_when=FIRST_COMPLETED)
+                    results = [(jobs.pop(job), job) for job in done]
+                    submit(len(results))
+                    for ext, job in results:
+                        yield (ext, job.result())
+            finally:
+                for job in jobs:
+                    job.cancel()
+
+    def download(
+        self,
+        path: str,
+        fileobj: BinaryIO,
+        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+        max_size: Optional[int] = None,
+    ) -> str:
+        """
+        Download a file from the store, like an extension archive, by chunks.
+        The progress callback is called with downloaded and total sizes (if known).
+        Return the sha256 of the downloaded content
         """
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            jobs = {
-                executor.submit(lambda u: self.find(u, shell_version), ext): ext
-                for ext in extensions
-            }
-            for job in as_completed(jobs.keys()):
-                uuid = jobs[job]
-                yield (uuid, job.result())
+        digest = sha256()
+        with self._get(path, stream=True) as resp:
+            resp.raise_for_status()
+            total = resp.headers.get("Content-Length")
+            total = int(total) if total is not None else None
+            if max_size is not None and total is not None and total > max_size:
+                raise ValueError(f"File is too large ({total} bytes)")
+            size = 0
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise ValueError(f"File is too large (more than {max_size} bytes)")
+                digest.update(chunk)
+                fileobj.write(chunk)
+                if progress is not None:
+                    progress(size, total)
+        metrics.inc("gext_downloaded_bytes_total", size)
+        return digest.hexdigest()
 
     def find(
         self, ext: Union[str, int], shell_version: Optional[str] = None
@@ -73,16 +299,8 @@ class GnomeExtensionStore:
         params = {"uuid": uuid}
         if shell_version is not None:
             params["shell_version"] = str(shell_version)
-        resp = self.session.get(
-            f"{self.url}/extension-info/",
-            params=params,
-            timeout=self.timeout,
-        )
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
-
-        return AvailableExtension.model_validate_json(resp.text)
+        with span("store-lookup", uuid=uuid):
+            return self._fetch_info(params)
 
     def find_by_pk(
         self, pk: int, shell_version: Optional[str] = None
@@ -93,37 +311,108 @@ class GnomeExtensionStore:
         params = {"pk": str(pk)}
         if shell_version is not None:
             params["shell_version"] = str(shell_version)
-        resp = self.session.get(
-            f"{self.url}/extension-info/",
+        with span("store-lookup", pk=pk):
+            return self._fetch_info(params)
+
+    def _fetch_info(self, params: Dict[str, str]) -> Optional[AvailableExtension]:
+        """
+        Query /extension-info/ using the cache if any
+        """
+        # mirrors serve the same content, other stores do not
+        key = f"{self.url}/extension-info/?{urlencode(sorted(params.items()))}"
+        entry = self.cache.get(key) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            metrics.inc("gext_cache_requests_total", cache="store", result="hit")
+            return self._decode_info(entry)
+
+        resp = self._get(
+            "/extension-info/",
             params=params,
-            timeout=self.timeout,
+            headers=entry.validators() if entry is not None else None,
         )
-        if resp.status_code == 404:
+        if self.cache is not None:
+            metrics.inc(
+                "gext_cache_requests_total",
+                cache="store",
+                result="revalidated" if resp.status_code == 304 else "miss",
+            )
+        if resp.status_code == 304 and entry is not None:
+            # not modified, refresh the cached entry
+            entry.timestamp = time.time()
+        elif resp.status_code == 404:
+            entry = CacheEntry(timestamp=time.time(), status=404)
+        else:
+            resp.raise_for_status()
+            entry = CacheEntry(
+                timestamp=time.time(),
+                status=resp.status_code,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                body=resp.text,
+            )
+        if self.cache is not None:
+            self.cache.put(key, entry)
+        return self._decode_info(entry)
+
+    def _decode_info(self, entry: CacheEntry) -> Optional[AvailableExtension]:
+        if entry.status == 404 or entry.body is None:
             return None
-        resp.raise_for_status()
-        return AvailableExtension.model_validate_json(resp.text)
+        return AvailableExtension.model_validate_json(entry.body)
 
     def search(
-        self, motif: str, shell_version: str = "all", limit: int = 0
+        self,
+        motif: str,
+        shell_version: str = "all",
+        limit: int = 0,
+        page_size: Optional[int] = None,
     ) -> Iterable[AvailableExtension]:
         """
         Search for extensions
+
+        Once the first page is fetched, following pages are fetched in parallel
+        and results are yielded in rank order
         """
-        params = {"search": motif, "shell_version": shell_version, "page": 1}
+        params: Dict[str, Any] = {"search": motif, "shell_version": shell_version}
+        if page_size is not None:
+            params["n"] = page_size
         found = 0
-        while True:
-            resp = self.session.get(
-                f"{self.url}/extension-query/",
-                params=params,
-                timeout=self.timeout,
-            )
-            resp.raise_for_status()
-            data = Search.model_validate_json(resp.text)
+        for data in self._iter_pages(params, limit):
             for ext in data.extensions:
                 yield ext
                 found += 1
                 if 0 < limit <= found:
                     return
-            if params["page"] >= data.numpages:
-                break
-            params["page"] += 1
+
+    def _iter_pages(self, params: Dict[str, Any], limit: int = 0) -> Iterable[Search]:
+        """
+        Fetch all pages of a search, prefetching at most max_workers pages ahead
+        """
+        first = self._query_page(params, 1)
+        yield first
+        numpages = first.numpages
+        if limit > 0 and len(first.extensions) > 0:
+            # do not fetch pages beyond the limit
+            numpages = min(numpages, ceil(limit / len(first.extensions)))
+        if numpages <= 1:
+            return
+        remaining = iter(range(2, numpages + 1))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            jobs = deque(
+                executor.submit(self._query_page, params, page)
+                for page in islice(remaining, self.max_workers)
+            )
+            try:
+                while len(jobs) > 0:
+                    data = jobs.popleft().result()
+                    for page in islice(remaining, 1):
+                        jobs.append(executor.submit(self._query_page, params, page))
+                    yield data
+            finally:
+                for job in jobs:
+                    job.cancel()
+
+    def _query_page(self, params: Dict[str, Any], page: int) -> Search:
+        with span("store-search", page=page):
+            resp = self._get("/extension-query/", params={**params, "page": page})
+            resp.raise_for_status()
+            return Search.model_validate_json(resp.text)
@@ -0,0 +1,147 @@
+"""
+gnome-extensions-cli
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class Span:
+    """
+    A timed phase of the command, times are given by time.perf_counter
+    """
+
+    name: str
+    start: float
+    duration: float
+    thread: int
+    thread_name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Recorder:
+    """
+    Collect the spans of the running command, from all threads
+    """
+
+    origin: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+
+    def add(self, name: str, start: float, duration: float, **args: Any):
+        thread = threading.current_thread()
+        # list.append is atomic, no lock is needed between threads
+        self.spans.append(
+            Span(name, start, duration, thread.ident or 0, thread.name, args)
+        )
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def report(self) -> List[Tuple[str, int, float, float]]:
+        """
+        Return the count, total and max duration of each phase, in order of first
+        occurrence
+        """
+        out: Dict[str, Tuple[int, float, float]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            count, total, longest = out.get(span.name, (0, 0.0, 0.0))
+            out[span.name] = (
+                count + 1,
+                total + span.duration,
+                max(longest, span.duration),
+            )
+        return [(name, *values) for name, values in out.items()]
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Export spans as Chrome trace events, which can be loaded in chrome://tracing
+        or https://ui.perfetto.dev
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": thread,
+                "args": {"name": name},
+            }
+            for thread, name in {s.thread: s.thread_name for s in self.spans}.items()
+        ]
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "gext",
+                    "ph": "X",
+                    "ts": round((span.start - self.origin) * 1e6, 1),
+                    "dur": round(span.duration * 1e6, 1),
+                    "pid": pid,
+                    "tid": span.thread,
+                    "args": span.args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_trace(self, path: Path):
+        path.write_text(json.dumps(self.chrome_trace()))
+
+
+_RECORDER: Optional[Recorder] = None
+
+
+def start_recording() -> Recorder:
+    """
+    Start recording spans for the current process
+    """
+    global _RECORDER  # pylint: disable=global-statement
+    _RECORDER = Recorder()
+    return _RECORDER
+
+
+def stop_recording() -> Optional[Recorder]:
+    global _RECORDER  # pylint: disable=global-statement
+    out, _RECORDER = _RECORDER, None
+    return out
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """
+    Time the enclosed block as a phase of the command, does nothing when not
+    recording
+    """
+    recorder = _RECORDER
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, start, time.perf_counter() - start, **args)
+
+
+def process_start() -> Optional[float]:
+    """
+    Return the creation time of the current process, on the time.perf_counter scale,
+    or None if unknown. Only available on Linux, with a resolution of a clock tick
+    """
+    try:
+        stat = Path("/proc/self/stat").read_text()
+        # fields after the command name, which may contain spaces
+        start_ticks = int(stat[stat.rindex(")") + 2 :].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf(
+            "SC_CLK_TCK"
+        )
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return time.perf_counter() - max(age, 0)
@@ -2,10 +2,31 @@
 gnome-extensions-cli
 """
 
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Optional, Tuple
 
 from packaging.version import Version
 
+# sort key of a version, None being lower than any version
+VersionKey = Tuple[Any, ...]
+
+
+@lru_cache(maxsize=4096)
+def parse_version(text: str) -> Version:
+    """
+    Parse a version, parsed versions are cached
+    """
+    return Version(text)
+
+
+def version_key(version: Any) -> VersionKey:
+    """
+    Sort key of a version given as None, integer, float or string
+    """
+    if version is None:
+        return ()
+    return (parse_version(str(version)),)
+
 
 def version_comparator(left: Any, right: Any) -> int:
     """
@@ -13,14 +34,10 @@ def version_comparator(left: Any, right: Any) -> int:
     """
     if left == right:
         return 0
-    if left is None:
-        return 1
-    if right is None:
-        return -1
-    vleft, vright = Version(str(left)), Version(str(right))
-    if vleft < vright:
+    kleft, kright = version_key(left), version_key(right)
+    if kleft < kright:
         return 1
-    if vleft > vright:
+    if kleft > kright:
         return -1
     return 0
 
@@ -0,0 +1,447 @@
+"""
+gnome-extensions-cli
+
+Synthetic extension trees, fake desktop tools and a local stand-in for the Gnome
+website API, shared by tests and benchmarks
+"""
+
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from math import ceil
+from pathlib import Path
+from threading import Thread
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+from zipfile import ZipFile
+
+from gnome_extensions_cli.dconf import ENABLED_EXTENSIONS_KEY, gvdb_hash
+
+SHELL_VERSION = "46"
+PAGE_SIZE = 10
+ROOT = Path(__file__).resolve().parent.parent
+
+# variables of the user session which must not leak into the fake desktop
+IGNORED_ENV = (
+    "XDG_RUNTIME_DIR",
+    "DCONF_PROFILE",
+    "GSETTINGS_BACKEND",
+    "GEXT_STORE_MIRRORS",
+)
+
+# make the system folders configurable for the tests and benchmarks
+BOOTSTRAP = """
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+import gnome_extensions_cli.filesystem as filesystem
+from gnome_extensions_cli.cli import run
+
+
+@dataclass
+class BenchManager(filesystem.FilesystemExtensionManager):
+    system_folders: List[Path] = field(
+        default_factory=lambda: [Path(os.environ["BENCH_SYSTEM_FOLDER"])]
+    )
+
+
+filesystem.FilesystemExtensionManager = BenchManager
+run()
+"""
+
+
+def extension_uuid(index: int) -> str:
+    return f"bench-{index:05d}@gext.example.com"
+
+
+def extension_metadata(index: int, version: int) -> Dict:
+    return {
+        "uuid": extension_uuid(index),
+        "name": f"Bench extension {index}",
+        "description": f"Synthetic extension number {index} used by benchmarks",
+        "shell-version": [SHELL_VERSION],
+        "url": "https://example.com",
+        "version": version,
+    }
+
+
+def extension_archive(index: int, version: int) -> bytes:
+    """
+    Build the zip archive of an extension, like the ones served by the Gnome website
+    """
+    buffer = BytesIO()
+    with ZipFile(buffer, "w") as zipfile:
+        zipfile.writestr(
+            "metadata.json", json.dumps(extension_metadata(index, version))
+        )
+        zipfile.writestr("extension.js", "export default class Extension {}\n" * 50)
+        zipfile.writestr("stylesheet.css", ".bench { color: red; }\n" * 20)
+    return buffer.getvalue()
+
+
+def serialize_string_array(values: List[str]) -> bytes:
+    """
+    Serialize a GVariant of type 'as'
+    """
+    data = b""
+    ends = []
+    for value in values:
+        data += value.encode() + b"\0"
+        ends.append(len(data))
+    for size, fmt in ((1, "B"), (2, "H"), (4, "I")):
+        if len(data) + len(ends) * size <= (1 << (8 * size)) - 1:
+            return data + b"".join(struct.pack("<" + fmt, end) for end in ends)
+    raise ValueError("Array is too large")
+
+
+def gvdb_parent(key: str) -> Optional[str]:
+    """
+    Return the dconf folder containing a key or a folder, None for the root folder
+    """
+    if not key.startswith("/") or key == "/":
+        return None
+    return key[: key.rstrip("/").rindex("/") + 1]
+
+
+def build_gvdb(
+    values: Dict[str, List[str]], locks: Sequence[str] = (), n_buckets: int = 4
+) -> bytes:
+    """
+    Build a GVDB file of string arrays laid out like dconf databases: keys are
+    stored relative to their parent folder item, items are spread over hash
+    buckets, and locked keys are listed with their full name in a nested .locks
+    table
+    """
+    root_keys = set(values)
+    for key in values:
+        parent = gvdb_parent(key)
+        while parent is not None:
+            root_keys.add(parent)
+            parent = gvdb_parent(parent)
+    if locks:
+        root_keys.add(".locks")
+
+    def bucket(key: str) -> int:
+        return gvdb_hash(key.encode()) % n_buckets
+
+    # items are grouped by bucket
+    root = sorted(root_keys, key=lambda k: (bucket(k), k))
+    locked = sorted(locks, key=lambda k: (bucket(k), k))
+    header_size = 24
+    root_size = 8 + 4 * n_buckets + 24 * len(root)
+    locks_start = header_size + root_size
+    locks_size = 8 + 4 * n_buckets + 24 * len(locked) if locks else 0
+    strings_start = locks_start + locks_size
+    strings = bytearray()
+
+    def add(data: bytes) -> Tuple[int, int]:
+        start = strings_start + len(strings)
+        strings.extend(data)
+        return start, start + len(data)
+
+    def table(keys: List[str], value: Callable[[str], Tuple[bytes, bytes]]) -> bytes:
+        index = {key: position for position, key in enumerate(keys)}
+        starts = [
+            next((i for i, key in enumerate(keys) if bucket(key) >= b), len(keys))
+            for b in range(n_buckets)
+        ]
+        items = b""
+        for key in keys:
+            parent = gvdb_parent(key)
+            if parent not in index:
+                # stored with its full name
+                parent = None
+            name = key[len(parent) :] if parent is not None else key
+            kind, data = value(key)
+            items += struct.pack(
+                "<IIIHccII",
+                gvdb_hash(key.encode()),
+                index[parent] if parent is not None else 0xFFFFFFFF,
+                add(name.encode())[0],
+                len(name.encode()),
+                kind,
+                b"\0",
+                *(
+                    (locks_start, locks_start + locks_size)
+                    if kind == b"H"
+                    else add(data)
+                ),
+            )
+        return (
+            struct.pack("<II", 0, n_buckets)
+            + struct.pack(f"<{n_buckets}I", *starts)
+            + items
+        )
+
+    def root_value(key: str) -> Tuple[bytes, bytes]:
+        if key in values:
+            return b"v", serialize_string_array(values[key]) + b"\0as"
+        if key == ".locks":
+            return b"H", b""
+        # folders list the indexes of their children
+        children = [i for i, child in enumerate(root) if gvdb_parent(child) == key]
+        return b"L", struct.pack(f"<{len(children)}I", *children)
+
+    root_table = table(root, root_value)
+    # locked keys have an empty string as value
+    locks_table = table(locked, lambda _key: (b"v", b"\0\0s")) if locks else b""
+    header = b"GVariant" + struct.pack(
+        "<IIII", 0, 0, header_size, header_size + len(root_table)
+    )
+    return header + root_table + locks_table + bytes(strings)
+
+
+def write_dconf(path: Path, enabled_uuids: List[str]):
+    """
+    Write a dconf database containing only the enabled extensions key
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(build_gvdb({ENABLED_EXTENSIONS_KEY: enabled_uuids}))
+
+
+# gsettings stand-in, storing the enabled extensions in the dconf database
+FAKE_GSETTINGS = """\
+import ast, sys
+from pathlib import Path
+sys.path.insert(0, {root!r})
+from tests.helpers import write_dconf
+from gnome_extensions_cli.dconf import ENABLED_EXTENSIONS_KEY, GvdbFile
+database = Path({database!r})
+if sys.argv[1] == "get":
+    uuids = GvdbFile(database.read_bytes()).read_string_array(ENABLED_EXTENSIONS_KEY)
+    print(repr(uuids or []))
+elif sys.argv[1] == "set":
+    write_dconf(database, ast.literal_eval(sys.argv[4]))
+"""
+
+
+@dataclass
+class Desktop:
+    """
+    A fake desktop session: home folder with user extensions, system extensions,
+    dconf database and stand-ins for the desktop tools
+    """
+
+    root: Path
+    home: Path = field(init=False)
+    system_folder: Path = field(init=False)
+    bin_folder: Path = field(init=False)
+
+    def __post_init__(self):
+        self.home = self.root / "home"
+        self.system_folder = self.root / "system"
+        self.bin_folder = self.root / "bin"
+
+    @property
+    def user_folder(self) -> Path:
+        return self.home / ".local" / "share" / "gnome-shell" / "extensions"
+
+    @property
+    def config_folder(self) -> Path:
+        return self.home / ".config"
+
+    @property
+    def dconf_database(self) -> Path:
+        return self.config_folder / "dconf" / "user"
+
+    def populate(self, count: int, versions: Dict[int, int]):
+        """
+        Install count extensions, half of them as system extensions, and enable
+        one extension out of two
+        """
+        enabled = []
+        for index in range(count):
+            folder = (self.system_folder if index % 2 else self.user_folder) / (
+                extension_uuid(index)
+            )
+            folder.mkdir(parents=True)
+            (folder / "metadata.json").write_text(
+                json.dumps(extension_metadata(index, versions[index]))
+            )
+            (folder / "extension.js").write_text("export default class {}\n")
+            if index % 2 == 0:
+                enabled.append(extension_uuid(index))
+        write_dconf(self.dconf_database, enabled)
+
+        self.bin_folder.mkdir(parents=True, exist_ok=True)
+        tools = {
+            "gsettings": FAKE_GSETTINGS.format(
+                root=str(ROOT), database=str(self.dconf_database)
+            ),
+            "dbus-send": "",
+            "glib-compile-schemas": "",
+        }
+        for name, script in tools.items():
+            path = self.bin_folder / name
+            path.write_text(f"#!{sys.executable}\n{script}")
+            path.chmod(0o755)
+
+
+@dataclass
+class FakeStore:
+    """
+    Serve /extension-info/, /extension-query/ and archive downloads for extensions
+    0 to count-1, versions are given by extension index
+    """
+
+    versions: Dict[int, int]
+    latency: float = 0.0
+    server: Optional[ThreadingHTTPServer] = field(init=False, default=None)
+    requests: int = field(init=False, default=0)
+    # send the size of responses, otherwise the connection is closed at the end
+    content_length: bool = True
+
+    @property
+    def url(self) -> str:
+        assert self.server is not None
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def info(self, index: int, shell_version: Optional[str]) -> Dict[str, Any]:
+        metadata = extension_metadata(index, self.versions[index])
+        version = self.versions[index]
+        out = {
+            "uuid": metadata["uuid"],
+            "pk": index + 1,
+            "name": metadata["name"],
+            "description": metadata["description"],
+            "creator": "bench",
+            "link": f"/extension/{index + 1}/bench/",
+            "icon": "/static/images/plugin.png",
+            "screenshot": None,
+            "shell_version_map": {SHELL_VERSION: {"pk": index + 1, "version": version}},
+        }
+        if shell_version == SHELL_VERSION:
+            out.update(
+                version=version,
+                version_tag=index + 1,
+                download_url=f"/download-extension/{metadata['uuid']}.shell-extension.zip"
+                + f"?version_tag={index + 1}",
+            )
+        return out
+
+    def find(self, query: Dict[str, str]) -> Optional[int]:
+        if "pk" in query:
+            index = int(query["pk"]) - 1
+        elif "uuid" in query:
+            try:
+                index = int(query["uuid"].split("@")[0].split("-")[1])
+            except (IndexError, ValueError):
+                return None
+        else:
+            return None
+        return index if index in self.versions else None
+
+    def start(self):
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_args):
+                pass
+
+            def reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if store.content_length:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                store.requests += 1
+                time.sleep(store.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/extension-info/":
+                    index = store.find(query)
+                    if index is None:
+                        self.reply(404, b"{}", "application/json")
+                    else:
+                        body = store.info(index, query.get("shell_version"))
+                        self.reply(200, json.dumps(body).encode(), "application/json")
+                elif url.path == "/extension-query/":
+                    motif = query.get("search", "").lower()
+                    size = int(query.get("n", PAGE_SIZE))
+                    page = int(query.get("page", 1))
+                    matches = [
+                        index
+                        for index in sorted(store.versions)
+                        if motif in extension_metadata(index, 0)["name"].lower()
+                    ]
+                    body = {
+                        "extensions": [
+                            store.info(index, None)
+                            for index in matches[(page - 1) * size : page * size]
+                        ],
+                        "total": len(matches),
+                        "numpages": max(1, ceil(len(matches) / size)),
+                    }
+                    self.reply(200, json.dumps(body).encode(), "application/json")
+                elif url.path.startswith("/download-extension/"):
+                    index = int(query.get("version_tag", 0)) - 1
+                    if index not in store.versions:
+                        self.reply(404, b"", "text/plain")
+                    else:
+                        self.reply(
+                            200,
+                            extension_archive(index, store.versions[index]),
+                            "application/zip",
+                        )
+                else:
+                    self.reply(404, b"", "text/plain")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_args):
+        self.stop()
+
+
+def run_gext(
+    args: List[str], desktop: Desktop, store: Optional[FakeStore] = None
+) -> "subprocess.CompletedProcess[str]":
+    """
+    Run gext with the filesystem backend in a subprocess, on the fake desktop and
+    store, nothing from the user session is used
+    """
+    env = {key: value for key, value in os.environ.items() if key not in IGNORED_ENV}
+    env.update(
+        PATH=f"{desktop.bin_folder}{os.pathsep}{os.environ.get('PATH', '')}",
+        PYTHONPATH=str(ROOT),
+        HOME=str(desktop.home),
+        XDG_CONFIG_HOME=str(desktop.config_folder),
+        XDG_CACHE_HOME=str(desktop.root / "cache"),
+        GEXT_NO_DAEMON="1",
+        NO_COLOR="1",
+        # nothing listens on the discard port when no store is given
+        GEXT_STORE_URL=store.url if store is not None else "http://127.0.0.1:9",
+        BENCH_SYSTEM_FOLDER=str(desktop.system_folder),
+    )
+    return subprocess.run(
+        [sys.executable, "-c", BOOTSTRAP, "-F", "--shell-version", SHELL_VERSION]
+        + args,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
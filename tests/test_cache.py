@@ -0,0 +1,76 @@
+import os
+import time
+
+from gnome_extensions_cli.cache import ArchiveCache, CacheEntry, StoreCache, file_digest
+
+
+def test_cache(tmp_path):
+    cache = StoreCache(folder=tmp_path, ttl=60, negative_ttl=120)
+    assert cache.get("foo") is None
+
+    cache.put("foo", CacheEntry(timestamp=time.time(), status=200, etag='"abc"'))
+    entry = cache.get("foo")
+    assert entry is not None
+    assert entry.status == 200
+    assert cache.is_fresh(entry)
+    assert entry.validators() == {"If-None-Match": '"abc"'}
+
+    entry.timestamp -= 90
+    assert not cache.is_fresh(entry)
+    assert cache.is_fresh(CacheEntry(timestamp=entry.timestamp, status=404))
+
+    cache.clear()
+    assert cache.get("foo") is None
+
+
+def test_unwritable(tmp_path):
+    # the cache folder cannot be created under a regular file
+    (tmp_path / "file").touch()
+    cache = StoreCache(folder=tmp_path / "file" / "store")
+    cache.put("foo", CacheEntry(timestamp=time.time(), status=200))
+    assert cache.get("foo") is None
+
+
+def test_eviction(tmp_path):
+    cache = StoreCache(folder=tmp_path, max_size=1024, evict_interval=1)
+    for index in range(10):
+        cache.put(
+            f"key{index}",
+            CacheEntry(timestamp=time.time(), status=200, body="x" * 200),
+        )
+        # make sure mtimes are ordered
+        os.utime(cache._path(f"key{index}"), (index, index))
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 1024
+    assert cache.get("key9") is not None
+    assert cache.get("key0") is None
+
+
+def test_archive_cache(tmp_path):
+    archive = tmp_path / "ext.zip"
+    archive.write_bytes(b"foo")
+    cache = ArchiveCache(folder=tmp_path / "archives", max_size=10)
+    assert cache.get("foo@bar", 1) is None
+
+    cached = cache.put("foo@bar", 1, archive, file_digest(archive))
+    assert cache.get("foo@bar", 1) == cached
+    assert cache.get("foo@bar", 2) is None
+
+    # corrupted archives are ignored
+    cached.write_bytes(b"bar")
+    assert cache.get("foo@bar", 1) is None
+
+    for version in range(5):
+        cache.put("foo@bar", version, archive, file_digest(archive))
+    assert len(list(cache.folder.glob("*/*.zip"))) == 3
+    assert cache.get("foo@bar", 4) is not None
+
+    # archives larger than the cache are not stored
+    archive.write_bytes(b"x" * 11)
+    assert cache.put("foo@bar", 5, archive, file_digest(archive)) is None
+    assert cache.get("foo@bar", 5) is None
+    assert len(list(cache.folder.glob("*/*.zip"))) == 3
+
+    # caching is best effort
+    (tmp_path / "file").touch()
+    cache = ArchiveCache(folder=tmp_path / "file" / "archives")
+    assert cache.put("foo@bar", 1, archive, file_digest(archive)) is None
@@ -0,0 +1,112 @@
+import re
+import time
+from argparse import Namespace
+from pathlib import Path
+
+from gnome_extensions_cli.catalog import MAX_AGE, ExtensionCatalog
+from gnome_extensions_cli.commands.catalog import run_sync
+from gnome_extensions_cli.commands.show import select_source
+from gnome_extensions_cli.schema import AvailableExtension, Search
+from gnome_extensions_cli.store import GnomeExtensionStore
+
+SAMPLES_DIR = Path(__file__).parent / "samples"
+
+
+class FakeStore:
+    endpoint = "https://extensions.example.com"
+
+    def __init__(self, *extensions: AvailableExtension):
+        self.extensions = list(extensions)
+
+    def search(self, motif, shell_version="all", limit=0, page_size=None):
+        yield from self.extensions
+
+
+def test_catalog(tmp_path):
+    extensions = Search.model_validate_json(
+        (SAMPLES_DIR / "search.json").read_text()
+    ).extensions
+    catalog = ExtensionCatalog(path=tmp_path / "catalog.sqlite")
+    assert not catalog.exists()
+
+    assert catalog.sync(FakeStore(*extensions)) == (len(extensions), 0, 0)
+    assert catalog.exists()
+    assert catalog.count() == len(extensions)
+
+    # incremental sync
+    changed = extensions[0].model_copy(update={"name": "Changed name"})
+    assert catalog.sync(FakeStore(changed, *extensions[1:-1])) == (0, 1, 1)
+    assert catalog.count() == len(extensions) - 1
+
+    results = list(catalog.search("changed"))
+    assert [e.uuid for e in results] == [changed.uuid]
+    assert list(catalog.search("this-does-not-match")) == []
+    assert len(list(catalog.search("", limit=3))) == 3
+
+    assert catalog.find(changed.uuid) == changed
+    assert catalog.find(str(changed.pk)) == changed
+    assert catalog.find(extensions[-1].uuid) is None
+
+
+def test_shell_version(tmp_path):
+    available = AvailableExtension.model_validate_json(
+        (SAMPLES_DIR / "available-alt.json").read_text()
+    )
+    catalog = ExtensionCatalog(path=tmp_path / "catalog.sqlite")
+    catalog.sync(FakeStore(available))
+
+    ext = catalog.find(available.uuid, shell_version="43.2")
+    assert ext is not None
+    assert ext.version == available.shell_version_map["43"].version
+    assert ext.download_url is not None
+    # no compatible version
+    assert catalog.find(available.uuid, shell_version="1.0") is None
+
+
+def test_stale(tmp_path):
+    catalog = ExtensionCatalog(path=tmp_path / "catalog.sqlite")
+    assert catalog.age() is None and catalog.is_stale()
+    catalog.sync(FakeStore())
+    assert 0 <= catalog.age() < 60
+    assert not catalog.is_stale()
+    with catalog.connection:
+        catalog.connection.execute(
+            "UPDATE properties SET value = ? WHERE key = 'last_sync'",
+            (str(time.time() - MAX_AGE - 60),),
+        )
+    assert catalog.is_stale()
+    assert not catalog.is_stale(max_age=2 * MAX_AGE)
+
+
+def test_select_source(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    store = GnomeExtensionStore()
+    assert select_source(store) is store
+
+    catalog = ExtensionCatalog()
+    catalog.sync(FakeStore())
+    assert isinstance(select_source(store), ExtensionCatalog)
+    assert select_source(store, online=True) is store
+    assert capsys.readouterr().err == ""
+
+    with catalog.connection:
+        catalog.connection.execute(
+            "UPDATE properties SET value = ? WHERE key = 'last_sync'",
+            (str(time.time() - 10 * 86400),),
+        )
+    # out of date catalogs are still used offline, with a warning
+    assert isinstance(select_source(store), ExtensionCatalog)
+    assert "synchronized 10 days ago" in capsys.readouterr().err
+
+
+def test_sync_command(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    extensions = Search.model_validate_json(
+        (SAMPLES_DIR / "search.json").read_text()
+    ).extensions
+    for _ in range(2):
+        run_sync(Namespace(page_size=None), None, FakeStore(*extensions))
+    out = re.sub(r"\x1b\[[0-9;]*m", "", capsys.readouterr().out).splitlines()
+    assert f"({len(extensions)} added, 0 updated, 0 removed)" in out[1]
+    # counts of 0 are printed too
+    assert "(0 added, 0 updated, 0 removed)" in out[3]
@@ -1,4 +1,6 @@
 import shlex
+import subprocess
+import sys
 from typing import List, Tuple
 from unittest import mock
 
@@ -31,6 +33,8 @@ def assert_no_error(
 
 def test_help(capsys):
     assert_no_error(*run(capsys, "--help"))
+    assert_no_error(*run(capsys, "catalog --help"))
+    assert_no_error(*run(capsys, "catalog sync --help"))
     assert_no_error(*run(capsys, "disable --help"))
     assert_no_error(*run(capsys, "enable --help"))
     assert_no_error(*run(capsys, "install --help"))
@@ -40,6 +44,7 @@ def test_help(capsys):
     assert_no_error(*run(capsys, "show --help"))
     assert_no_error(*run(capsys, "uninstall --help"))
     assert_no_error(*run(capsys, "update --help"))
+    assert_no_error(*run(capsys, "watch --help"))
 
 
 def test_version(capsys):
@@ -53,3 +58,48 @@ def test_error(capsys):
     assert rc > 0
     assert len(out) == 0
     assert len(err) > 0
+
+
+# dependencies which must not be loaded to parse arguments
+HEAVY_MODULES = ["requests", "urllib3", "pydantic", "tqdm", "colorama", "gi"]
+# budget for importing the cli module, in microseconds
+IMPORT_BUDGET = 100_000
+
+
+def loaded_modules(args: str) -> List[str]:
+    script = (
+        "import shlex, sys\n"
+        + "from gnome_extensions_cli import cli\n"
+        + f"sys.argv = ['gext'] + shlex.split({args!r})\n"
+        + "try:\n"
+        + "    cli.run()\n"
+        + "except SystemExit:\n"
+        + "    pass\n"
+        + f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    stdout = subprocess.check_output([sys.executable, "-c", script], text=True)
+    return list(filter(None, stdout.splitlines()[-1].split(",")))
+
+
+def test_lazy_imports():
+    assert loaded_modules("--version") == []
+    assert loaded_modules("--help") == []
+    # only the selected subcommand and its dependencies are loaded
+    assert set(loaded_modules("list --help")) <= {"pydantic", "colorama"}
+    assert "tqdm" not in loaded_modules("search --help")
+    assert "requests" not in loaded_modules("install --help")
+
+
+def test_import_time():
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import gnome_extensions_cli.cli"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    cumulative = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    }
+    assert cumulative["gnome_extensions_cli.cli"] < IMPORT_BUDGET
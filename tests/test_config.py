@@ -0,0 +1,34 @@
+from gnome_extensions_cli.config import DEFAULT_STORE_URL, StoreConfig
+
+
+def test_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("GEXT_STORE_URL", raising=False)
+    monkeypatch.delenv("GEXT_STORE_MIRRORS", raising=False)
+    config = StoreConfig.load(tmp_path / "missing.ini")
+    assert config.url == DEFAULT_STORE_URL
+    assert config.mirrors == []
+
+
+def test_config_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("GEXT_STORE_URL", raising=False)
+    monkeypatch.delenv("GEXT_STORE_MIRRORS", raising=False)
+    path = tmp_path / "config.ini"
+    path.write_text(
+        "[store]\n"
+        "url = https://mirror.example.com/\n"
+        "mirrors =\n"
+        "    https://extensions.gnome.org\n"
+        "    https://mirror.example.com, https://other.example.com\n"
+    )
+    config = StoreConfig.load(path)
+    assert config.url == "https://mirror.example.com"
+    assert config.mirrors == [
+        "https://extensions.gnome.org",
+        "https://other.example.com",
+    ]
+
+    monkeypatch.setenv("GEXT_STORE_URL", "http://localhost:8080")
+    monkeypatch.setenv("GEXT_STORE_MIRRORS", "")
+    config = StoreConfig.load(path)
+    assert config.url == "http://localhost:8080"
+    assert config.mirrors == []
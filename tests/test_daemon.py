@@ -0,0 +1,87 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from gnome_extensions_cli.cli import run, use_daemon
+from gnome_extensions_cli.daemon import forward, serve, socket_path
+
+
+def test_no_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert forward(["gext", "--version"]) is None
+    # stale socket
+    socket_path().touch()
+    assert forward(["gext", "--version"]) is None
+
+
+def test_unsupported(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.delattr(socket, "send_fds", raising=False)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path()))
+        server.listen()
+        # commands run locally when file descriptors cannot be passed
+        assert forward(["gext", "--version"]) is None
+    with pytest.raises(AssertionError, match="Python 3.9"):
+        serve(tmp_path / "other.sock", None)
+
+
+def test_daemon(tmp_path, monkeypatch, capfd):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / "cache"))
+    daemon = subprocess.Popen(
+        [sys.executable, "-c", "from gnome_extensions_cli.cli import run; run()"]
+        + ["daemon"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            if socket_path().exists():
+                break
+            time.sleep(0.1)
+        assert forward(["gext", "--version"]) == 0
+        assert forward(["gext", "foo"]) == 2
+        captured = capfd.readouterr()
+        assert captured.out.startswith("gext ")
+        assert "invalid choice" in captured.err
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=10)
+    assert not socket_path().exists()
+
+
+def test_use_daemon(monkeypatch):
+    calls = []
+
+    def fake_forward(argv):
+        calls.append(argv[1:])
+        return 0
+
+    monkeypatch.delenv("GEXT_NO_DAEMON", raising=False)
+    monkeypatch.setattr("gnome_extensions_cli.daemon.forward", fake_forward)
+    # an argument named daemon does not disable forwarding
+    monkeypatch.setattr("sys.argv", ["gext", "search", "daemon"])
+    with pytest.raises(SystemExit):
+        run()
+    assert calls == [["search", "daemon"]]
+
+    # commands which may prompt run locally in a terminal
+    master, slave = os.openpty()
+    with os.fdopen(master, "w") as _master, os.fdopen(slave) as stdin:
+        monkeypatch.setattr("sys.stdin", stdin)
+        assert not use_daemon("update")
+        assert use_daemon("list")
+        monkeypatch.setattr("sys.argv", ["gext", "update", "--help"])
+        with pytest.raises(SystemExit):
+            run()
+    assert calls == [["search", "daemon"]]
+
+    with open(os.devnull, encoding="utf-8") as stdin:
+        monkeypatch.setattr("sys.stdin", stdin)
+        assert use_daemon("update")
+        assert not use_daemon("daemon")
@@ -1,6 +1,28 @@
+from argparse import Namespace
+
 import pytest
 
+from gnome_extensions_cli.commands import watch
 from gnome_extensions_cli.dbus import DbusExtensionManager, test_dbus_available
+from gnome_extensions_cli.schema import ExtensionState, InstalledExtension
+
+
+def dbus_info(uuid: str, state: int) -> dict:
+    return {"uuid": uuid, "name": uuid, "state": float(state), "path": f"/tmp/{uuid}"}
+
+
+class FakeDbusManager(DbusExtensionManager):
+    def list_installed_extensions(self):
+        return [
+            InstalledExtension.from_dbus(dbus_info("foo@bar", 1)),
+            InstalledExtension.from_dbus(dbus_info("bar@bar", 2)),
+        ]
+
+    def watch_extensions(self, callback):
+        callback(InstalledExtension.from_dbus(dbus_info("foo@bar", 1)))
+        callback(InstalledExtension.from_dbus(dbus_info("foo@bar", 2)))
+        callback(InstalledExtension.from_dbus(dbus_info("new@bar", 1)))
+        raise KeyboardInterrupt()
 
 
 @pytest.mark.skipif(not test_dbus_available(True), reason="DBus is not available")
@@ -16,3 +38,15 @@ def test_dbus():
     assert len(enabled_extensions) > 0
 
     assert len(all_extensions) > len(enabled_extensions)
+
+
+def test_watch(capsys):
+    watch.run(Namespace(all=True), FakeDbusManager(), None)
+    out = capsys.readouterr().out.splitlines()
+    # initial states, hint, then only actual changes
+    assert len(out) == 5
+    assert "bar@bar" in out[0] and "disabled" in out[0]
+    assert "foo@bar" in out[1] and "enabled" in out[1]
+    assert "foo@bar" in out[3] and "enabled" in out[3] and "disabled" in out[3]
+    assert "new@bar" in out[4] and "unknown" in out[4]
+    assert ExtensionState.ENABLED.name.lower() in out[4]
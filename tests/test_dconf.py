@@ -0,0 +1,103 @@
+from pathlib import Path
+
+from gnome_extensions_cli.dconf import GvdbFile, read_string_array, system_databases
+
+from tests.helpers import build_gvdb
+
+
+def test_gvdb():
+    gvdb = GvdbFile(
+        build_gvdb(
+            {
+                "/org/gnome/shell/enabled-extensions": ["foo@bar", "todo@baz"],
+                "/org/gnome/shell/disabled-extensions": [],
+            }
+        )
+    )
+    assert gvdb.read_string_array("/org/gnome/shell/enabled-extensions") == [
+        "foo@bar",
+        "todo@baz",
+    ]
+    assert gvdb.read_string_array("/org/gnome/shell/disabled-extensions") == []
+    assert gvdb.read_string_array("/org/gnome/shell/unknown") is None
+    assert not gvdb.is_locked("/org/gnome/shell/enabled-extensions")
+
+    # arrays longer than 255 bytes use larger framing offsets
+    values = [f"extension-{index}@example.com" for index in range(3000)]
+    gvdb = GvdbFile(build_gvdb({"/foo": values[:100], "/bar": values}))
+    assert gvdb.read_string_array("/foo") == values[:100]
+    assert gvdb.read_string_array("/bar") == values
+
+
+def test_dconf_layout():
+    values = {
+        "/org/gnome/shell/enabled-extensions": ["foo@bar", "todo@baz"],
+        "/org/gnome/shell/disabled-extensions": ["old@bar"],
+        "/org/gnome/desktop/interface/clock-format": ["24h"],
+        "/org/gnome/shell/extensions/foo/enabled-extensions": ["nested@bar"],
+    }
+    locks = [
+        "/org/gnome/shell/enabled-extensions",
+        "/org/gnome/desktop/interface/clock-format",
+    ]
+    for n_buckets in (1, 2, 5, 16):
+        gvdb = GvdbFile(build_gvdb(values, locks, n_buckets=n_buckets))
+        assert gvdb.n_buckets == n_buckets
+        for key, value in values.items():
+            assert gvdb.read_string_array(key) == value
+        # folders are items of another type, unknown keys share their suffix
+        assert gvdb.lookup("/org/gnome/shell/") is None
+        assert gvdb.read_string_array("/org/gnome/enabled-extensions") is None
+        assert gvdb.read_string_array("/enabled-extensions") is None
+        assert gvdb.is_locked("/org/gnome/shell/enabled-extensions")
+        assert gvdb.is_locked("/org/gnome/desktop/interface/clock-format")
+        assert not gvdb.is_locked("/org/gnome/shell/disabled-extensions")
+
+    # keys are stored relative to their parent folder
+    gvdb = GvdbFile(build_gvdb(values, n_buckets=5))
+    names = {}
+    for index in range(gvdb.n_items):
+        item = gvdb._item(index)
+        names[gvdb.data[item[2] : item[2] + item[3]]] = item[1]
+    assert names[b"/"] == 0xFFFFFFFF
+    assert b"enabled-extensions" in names and names[b"enabled-extensions"] != 0xFFFFFFFF
+    assert b"/org/gnome/shell/enabled-extensions" not in names
+
+
+def test_locks():
+    gvdb = GvdbFile(build_gvdb({"/foo": ["a"]}, locks=["/foo"]))
+    assert gvdb.is_locked("/foo")
+    assert not gvdb.is_locked("/bar")
+    assert gvdb.read_string_array("/foo") == ["a"]
+
+
+def test_read_string_array(tmp_path):
+    database = tmp_path / "user"
+    assert read_string_array("/foo", database, []) is None
+
+    database.write_bytes(build_gvdb({"/foo": ["a"]}))
+    assert read_string_array("/foo", database, []) == ["a"]
+
+    database.write_bytes(build_gvdb({"/foo": ["a", "b"]}))
+    assert read_string_array("/foo", database, []) == ["a", "b"]
+
+    database.write_bytes(b"invalid")
+    assert read_string_array("/foo", database, []) is None
+
+
+def test_system_locks(tmp_path):
+    database = tmp_path / "user"
+    database.write_bytes(build_gvdb({"/foo": ["a"], "/bar": ["b"]}))
+    system = tmp_path / "local"
+    system.write_bytes(build_gvdb({"/foo": ["c"]}, locks=["/foo"]))
+    profile = tmp_path / "profile"
+    profile.write_text(
+        f"# comment\nuser-db:user\nsystem-db:local\nfile-db:{system} # locks\n"
+    )
+    assert system_databases(profile) == [Path("/etc/dconf/db/local"), system]
+    assert system_databases(tmp_path / "missing") == []
+
+    # locked keys are read with gsettings
+    assert read_string_array("/foo", database, [system]) is None
+    assert read_string_array("/bar", database, [system]) == ["b"]
+    assert read_string_array("/foo", database, [tmp_path / "missing"]) == ["a"]
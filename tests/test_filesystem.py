@@ -1,6 +1,22 @@
-from gnome_extensions_cli.filesystem import FilesystemExtensionManager
+import json
+from shutil import rmtree
+from zipfile import ZipFile
+
+import pytest
+
+from gnome_extensions_cli.cache import ArchiveCache, MetadataIndex, file_digest
+from gnome_extensions_cli.filesystem import (
+    FilesystemExtensionManager,
+    SchemaCompilation,
+    extract_archive,
+    swap_folder,
+)
+from gnome_extensions_cli.icons import Label
+from gnome_extensions_cli.schema import AvailableExtension
 from gnome_extensions_cli.store import GnomeExtensionStore
 
+from tests.helpers import extension_archive, extension_metadata, extension_uuid
+
 
 def test_filesystem():
     manager = FilesystemExtensionManager(store=GnomeExtensionStore())
@@ -14,3 +30,121 @@ def test_filesystem():
     assert len(enabled_extensions) >= 0
 
     assert len(all_extensions) >= len(enabled_extensions)
+
+
+def test_extract_archive(tmp_path):
+    archive = tmp_path / "ext.zip"
+    with ZipFile(archive, "w") as zipfile:
+        zipfile.writestr("metadata.json", '{"uuid": "foo@bar", "name": "Foo"}')
+        zipfile.writestr("schemas/foo.gschema.xml", "x" * 1000)
+
+    with pytest.raises(ValueError, match="too large"):
+        extract_archive(archive, tmp_path / "too-small", max_size=100)
+
+    extract_archive(archive, tmp_path / "ext", max_size=2000)
+    assert (tmp_path / "ext" / "metadata.json").is_file()
+    assert (tmp_path / "ext" / "schemas" / "foo.gschema.xml").is_file()
+
+
+def test_swap_folder(tmp_path):
+    target = tmp_path / "ext"
+    target.mkdir()
+    (target / "old").touch()
+
+    # failing swap keeps the previous folder
+    with pytest.raises(FileNotFoundError):
+        swap_folder(tmp_path / "missing", target)
+    assert (target / "old").is_file()
+
+    source = tmp_path / "staging"
+    source.mkdir()
+    (source / "new").touch()
+    swap_folder(source, target)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ext"]
+    assert (target / "new").is_file()
+    assert not (target / "old").exists()
+
+
+def test_metadata_index(tmp_path):
+    def create_extension(folder, uuid, version):
+        (folder / uuid).mkdir(parents=True, exist_ok=True)
+        (folder / uuid / "metadata.json").write_text(
+            json.dumps({"uuid": uuid, "name": uuid, "version": version})
+        )
+
+    create_extension(tmp_path / "system", "foo@bar", 1)
+    create_extension(tmp_path / "user", "foo@bar", 2)
+    create_extension(tmp_path / "user", "baz@bar", 1)
+    (tmp_path / "user" / "not-an-extension").mkdir()
+
+    index = MetadataIndex(path=tmp_path / "index.json")
+    manager = FilesystemExtensionManager(
+        store=GnomeExtensionStore(),
+        user_folder=tmp_path / "user",
+        system_folders=[tmp_path / "system", tmp_path / "missing"],
+        metadata_index=index,
+    )
+    extensions = {e.uuid: e for e in manager.list_installed_extensions()}
+    assert sorted(extensions) == ["baz@bar", "foo@bar"]
+    assert extensions["foo@bar"].metadata.version == 2
+    assert len(json.loads(index.path.read_text())) == 3
+
+    # use the index, modified extensions are parsed again
+    create_extension(tmp_path / "user", "baz@bar", 10)
+    rmtree(tmp_path / "system")
+    manager.metadata_index = MetadataIndex(path=index.path)
+    extensions = {e.uuid: e for e in manager.list_installed_extensions()}
+    assert extensions["baz@bar"].metadata.version == 10
+    assert len(json.loads(index.path.read_text())) == 2
+
+
+def test_install_from_cache(tmp_path, capsys):
+    class Manager(FilesystemExtensionManager):
+        def list_enabled_uuids(self):
+            return []
+
+        def set_enabled_uuids(self, uuids):
+            return True
+
+        def compile_schemas(self, extension_folder):
+            compiled.append(extension_folder)
+            return SchemaCompilation.COMPILED
+
+    compiled = []
+    archive = tmp_path / "ext.zip"
+    archive.write_bytes(extension_archive(0, 2))
+    cache = ArchiveCache(folder=tmp_path / "archives")
+    cached = cache.put(extension_uuid(0), 2, archive, file_digest(archive))
+    assert cached is not None
+    manager = Manager(
+        store=GnomeExtensionStore(),
+        user_folder=tmp_path / "user",
+        system_folders=[],
+        archive_cache=cache,
+        dconf_database=None,
+    )
+    ext = AvailableExtension(
+        uuid=extension_uuid(0),
+        pk=1,
+        name="Bench extension 0",
+        description="",
+        creator="bench",
+        shell_version_map={},
+        version=2,
+        download_url="/download-extension/ext0.shell-extension.zip",
+    )
+
+    # the cached archive is used and reported instead of the download url
+    assert manager.install_extension(ext)
+    out = capsys.readouterr().out
+    assert str(cached) in out
+    assert "download-extension" not in out
+
+    # schemas are compiled in the staging folder, reported with the target one
+    target_dir = tmp_path / "user" / ext.uuid
+    assert compiled[0] != target_dir
+    assert [line for line in out.splitlines() if "Schemas compiled" in line] == [
+        f"Schemas compiled in {Label.folder(target_dir)}"
+    ]
+    metadata = json.loads((target_dir / "metadata.json").read_text())
+    assert metadata == extension_metadata(0, 2)
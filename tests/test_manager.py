@@ -0,0 +1,78 @@
+from typing import List
+
+from gnome_extensions_cli.manager import ExtensionManager
+
+
+class FakeManager(ExtensionManager):
+    def __init__(self, *uuids: str):
+        self.uuids = list(uuids)
+        self.writes = 0
+        self.restarts = 0
+
+    def get_current_shell_version(self) -> str:
+        return "45"
+
+    def list_installed_extensions(self):
+        return []
+
+    def install_extension(self, ext, prepared=None) -> bool:
+        return True
+
+    def uninstall_extension(self, ext):
+        pass
+
+    def edit_extension(self, ext):
+        pass
+
+    def list_enabled_uuids(self) -> List[str]:
+        return list(self.uuids)
+
+    def set_enabled_uuids(self, uuids: List[str]) -> bool:
+        self.uuids = list(uuids)
+        self.writes += 1
+        return True
+
+    def restart_shell(self) -> bool:
+        self.restarts += 1
+        return True
+
+
+def test_enable_disable():
+    manager = FakeManager("a")
+    assert manager.enable_uuids("b")
+    assert not manager.enable_uuids("a", "b")
+    assert manager.disable_uuids("a")
+    assert manager.uuids == ["b"]
+    assert manager.writes == 2
+
+
+def test_transaction(capsys):
+    manager = FakeManager("a", "b")
+    with manager.transaction():
+        assert manager.disable_uuids("a")
+        assert manager.enable_uuids("c")
+        with manager.transaction():
+            assert manager.enable_uuids("d")
+        assert manager.writes == 0
+    assert sorted(manager.uuids) == ["b", "c", "d"]
+    assert manager.writes == 1
+    assert manager.restarts == 0
+    # changes are printed once applied
+    assert capsys.readouterr().out.splitlines() == [
+        "Disable extension a",
+        "Enable extension c",
+        "Enable extension d",
+    ]
+
+    # disable/enable during an update restarts the shell without writing
+    with manager.transaction():
+        assert manager.disable_uuids("b")
+        assert manager.enable_uuids("b")
+    assert manager.writes == 1
+    assert manager.restarts == 1
+    assert capsys.readouterr().out == ""
+
+    with manager.transaction():
+        pass
+    assert manager.writes == 1
+    assert manager.restarts == 1
@@ -0,0 +1,89 @@
+import stat
+from typing import Dict
+
+import pytest
+
+from gnome_extensions_cli.metrics import Registry
+
+from tests.helpers import Desktop, FakeStore, run_gext
+
+
+def parse(text: str) -> Dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+def test_registry(tmp_path):
+    registry = Registry(labels={"command": "update"})
+    registry.inc("gext_downloaded_bytes_total", 1024)
+    registry.inc("gext_downloaded_bytes_total", 1024)
+    registry.inc("gext_cache_requests_total", cache="store", result="hit")
+    registry.inc("gext_cache_requests_total", cache="store", result="miss")
+    registry.inc("gext_cache_requests_total", cache="store", result="revalidated")
+    registry.inc("gext_cache_requests_total", cache="store", result="miss")
+    for value in (0.003, 0.02, 0.02, 42):
+        registry.observe("gext_http_request_duration_seconds", value, path='/"a"/')
+    registry.record_run(17)
+
+    path = tmp_path / "gext.prom"
+    registry.write(path)
+    text = path.read_text()
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert list(tmp_path.iterdir()) == [path]
+    assert "# TYPE gext_http_request_duration_seconds histogram" in text
+
+    samples = parse(text)
+    assert samples['gext_downloaded_bytes_total{command="update"}'] == 2048
+    assert samples['gext_last_run_exit_code{command="update"}'] == 17
+    assert samples['gext_cache_hit_ratio{command="update",cache="store"}'] == 0.5
+    histogram = (
+        'gext_http_request_duration_seconds_{}{{command="update",path="/\\"a\\"/"{}}}'
+    )
+    assert samples[histogram.format("bucket", ',le="0.005"')] == 1
+    assert samples[histogram.format("bucket", ',le="0.025"')] == 3
+    assert samples[histogram.format("bucket", ',le="10"')] == 3
+    assert samples[histogram.format("bucket", ',le="+Inf"')] == 4
+    assert samples[histogram.format("count", "")] == 4
+
+    # no temporary file is left when the metrics cannot be written
+    folder = tmp_path / "folder.prom"
+    folder.mkdir()
+    with pytest.raises(OSError):
+        registry.write(folder)
+    assert sorted(tmp_path.iterdir()) == [folder, path]
+
+
+def test_update(tmp_path):
+    path = tmp_path / "gext.prom"
+    # only enabled extensions (even indices) are updated, 0 is outdated
+    desktop = Desktop(tmp_path / "desktop")
+    desktop.populate(6, {index: 1 for index in range(6)})
+    with FakeStore({index: 2 if index < 2 else 1 for index in range(6)}) as store:
+        process = run_gext(["--metrics", str(path), "update", "--yes"], desktop, store)
+    assert process.returncode == 0, process.stderr
+
+    samples = parse(path.read_text())
+    counts = {
+        status: samples[f'gext_update_extensions{{command="update",status="{status}"}}']
+        for status in ("checked", "outdated", "updated", "failed", "not_found")
+    }
+    assert counts == {
+        "checked": 3,
+        "outdated": 1,
+        "updated": 1,
+        "failed": 0,
+        "not_found": 0,
+    }
+    assert samples['gext_last_run_exit_code{command="update"}'] == 0
+    assert samples['gext_downloaded_bytes_total{command="update"}'] > 0
+    assert samples['gext_cache_hit_ratio{command="update",cache="store"}'] == 0
+    requests = sum(
+        value
+        for key, value in samples.items()
+        if key.startswith("gext_http_requests_total") and 'code="200"' in key
+    )
+    assert requests == 4
+    assert 'gext_phase_calls{command="update",phase="download"}' in samples
@@ -1,7 +1,15 @@
+import json
 from pathlib import Path
 
-from gnome_extensions_cli.schema import AvailableExtension, Metadata, Search
-from gnome_extensions_cli.utils import version_comparator
+from gnome_extensions_cli.schema import (
+    AvailableExtension,
+    ExtensionState,
+    InstalledExtension,
+    Metadata,
+    Search,
+    load_all,
+)
+from gnome_extensions_cli.utils import version_comparator, version_key
 
 
 def test_version():
@@ -16,6 +24,12 @@ def test_version():
     ):
         assert version_comparator(a, b) == out
         assert version_comparator(b, a) == out * -1
+        assert (version_key(a) < version_key(b)) == (out > 0)
+
+
+def test_version_key():
+    assert Metadata(uuid="a", name="a", version=1).version_key == version_key(1)
+    assert version_key(None) < version_key(1) < version_key("2.0") == version_key(2)
 
 
 def test_schema():
@@ -57,3 +71,53 @@ def test_samples():
         Search.model_validate_json((samples_dir / "search.json").read_text())
         is not None
     )
+
+
+def test_load_all(tmp_path):
+    extensions = []
+    for index in range(20):
+        folder = tmp_path / f"ext{index}"
+        folder.mkdir()
+        (folder / "metadata.json").write_text(
+            json.dumps({"uuid": f"ext{index}@foo", "name": "Foo", "version": index})
+        )
+        extensions.append(InstalledExtension(folder))
+    assert load_all(extensions) == extensions
+    for index, ext in enumerate(extensions):
+        assert "metadata" in ext.__dict__
+        assert ext.uuid == f"ext{index}@foo"
+
+
+def test_from_dbus(tmp_path):
+    # gnome-shell serializes metadata strings, numbers and booleans only, arrays like
+    # shell-version are not sent
+    ext = InstalledExtension.from_dbus(
+        {
+            "uuid": "foo@bar",
+            "name": "Foo",
+            "description": "Foo extension",
+            "url": "https://github.com/foo/bar",
+            "settings-schema": "org.gnome.shell.extensions.foo",
+            "version": 12.0,
+            "state": 1.0,
+            "type": 2.0,
+            "path": str(tmp_path),
+            "error": "",
+            "hasPrefs": True,
+            "hasUpdate": False,
+            "canChange": True,
+        }
+    )
+    assert ext.folder == tmp_path
+    assert ext.state == ExtensionState.ENABLED
+    # metadata file is not read
+    assert not ext.metadata_json.exists()
+    assert ext.uuid == "foo@bar"
+    assert ext.metadata.version == 12
+    assert ext.metadata.url == "https://github.com/foo/bar"
+    assert ext.metadata.shell_version is None
+
+    ext = InstalledExtension.from_dbus(
+        {"uuid": "foo@bar", "name": "Foo", "state": 42.0, "path": str(tmp_path)}
+    )
+    assert ext.state is None
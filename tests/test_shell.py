@@ -0,0 +1,66 @@
+import pytest
+
+from gnome_extensions_cli.shell import (
+    detect_shell_version,
+    parse_shell_version,
+    read_gnome_version_file,
+)
+
+
+def test_parse_shell_version():
+    assert parse_shell_version("GNOME Shell 45.2\n") == "45.2"
+    assert parse_shell_version("GNOME Shell 3.38.4") == "3.38"
+    assert parse_shell_version("GNOME Shell 46") == "46"
+
+
+def test_gnome_version_file(tmp_path):
+    version_file = tmp_path / "gnome-version.xml"
+    assert read_gnome_version_file(version_file) is None
+    version_file.write_text(
+        "<gnome-version>\n  <platform>46</platform>\n  <minor>2</minor>\n"
+        + "  <micro></micro>\n</gnome-version>\n"
+    )
+    assert read_gnome_version_file(version_file) == "46.2"
+
+
+def test_detect_shell_version(tmp_path, monkeypatch):
+    binary = tmp_path / "bin" / "gnome-shell"
+    binary.parent.mkdir()
+    binary.write_text("#!/bin/sh\necho 'GNOME Shell 45.1'\n")
+    binary.chmod(0o755)
+    monkeypatch.setenv("PATH", str(binary.parent))
+    cache_file = tmp_path / "cache.json"
+    version_file = tmp_path / "gnome-version.xml"
+    version_file.write_text("<platform>47</platform><minor>1</minor>")
+
+    # the platform version does not override gnome-shell
+    assert detect_shell_version(cache_file, version_file) == "45.1"
+    assert cache_file.is_file()
+
+    # cached while the binary does not change
+    version_file.write_text("<platform>48</platform><minor>0</minor>")
+    assert detect_shell_version(cache_file, version_file) == "45.1"
+
+    binary.write_text("#!/bin/sh\necho 'GNOME Shell 46.0'\n")
+    assert detect_shell_version(cache_file, version_file) == "46.0"
+
+    # the platform version is used when gnome-shell fails or is missing
+    binary.write_text("#!/bin/sh\nexit 1\n")
+    assert detect_shell_version(cache_file, version_file) == "48.0"
+    binary.unlink()
+    assert detect_shell_version(cache_file, version_file) == "48.0"
+    version_file.unlink()
+    with pytest.raises(AssertionError):
+        detect_shell_version(cache_file, version_file)
+
+
+def test_detect_shell_version_broken_binary(tmp_path, monkeypatch):
+    binary = tmp_path / "bin" / "gnome-shell"
+    binary.parent.mkdir()
+    binary.symlink_to(tmp_path / "missing")
+    # which() checks the target, report the dangling link as found anyway
+    monkeypatch.setattr("gnome_extensions_cli.shell.which", lambda _: str(binary))
+    version_file = tmp_path / "gnome-version.xml"
+    version_file.write_text("<platform>47</platform><minor>1</minor>")
+
+    assert detect_shell_version(tmp_path / "cache.json", version_file) == "47.1"
@@ -0,0 +1,63 @@
+import os
+from typing import List
+
+from gnome_extensions_cli.schema import AvailableExtension, InstalledExtension
+from gnome_extensions_cli.state import StateSnapshot
+
+from .test_manager import FakeManager
+
+
+class InstalledManager(FakeManager):
+    def __init__(self, extensions: List[InstalledExtension], *uuids: str):
+        super().__init__(*uuids)
+        self.extensions = extensions
+
+    def list_installed_extensions(self):
+        return self.extensions
+
+
+def test_snapshot(tmp_path):
+    extensions = [
+        InstalledExtension.from_dbus(
+            {"uuid": uuid, "name": uuid, "version": 1, "path": str(tmp_path / uuid)}
+        )
+        for uuid in ("b@foo", "A@foo", "c@foo")
+    ]
+    state = StateSnapshot.load(InstalledManager(extensions, "b@foo", "other@foo"))
+    assert state.shell_version == "45"
+    assert [entry.uuid for entry in state] == ["A@foo", "b@foo", "c@foo"]
+    assert len(state) == 3
+    assert "b@foo" in state and "other@foo" not in state
+    assert state.get("b@foo").enabled and not state.get("c@foo").enabled
+    assert state.is_enabled("other@foo")
+    assert state.enabled_uuids == frozenset(["b@foo", "other@foo"])
+
+    available = AvailableExtension(
+        uuid="c@foo",
+        pk=42,
+        name="c",
+        description="",
+        creator="",
+        shell_version_map={},
+    )
+    assert state.get(42) is None
+    assert state.attach(available) is state.get("42")
+    assert state.get(42).extension is extensions[2]
+
+
+def test_read_only(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(os, "access", lambda *args: calls.append(args) or True)
+    extensions = [
+        InstalledExtension.from_dbus(
+            {"uuid": "a@foo", "name": "a", "path": str(tmp_path / "a@foo")}
+        ),
+        InstalledExtension.from_dbus(
+            {"uuid": "b@foo", "name": "b", "path": "/usr/share/b@foo", "type": 1.0}
+        ),
+    ]
+    state = StateSnapshot.load(InstalledManager(extensions))
+    # folders are only checked when needed
+    assert len(calls) == 0
+    assert state.get("a@foo").user and len(calls) == 1
+    assert state.get("b@foo").read_only and len(calls) == 1
@@ -1,5 +1,18 @@
+from hashlib import sha256
+from io import BytesIO
+
+import pytest
+
+from gnome_extensions_cli.cache import StoreCache
 from gnome_extensions_cli.store import GnomeExtensionStore
 
+from tests.helpers import (
+    SHELL_VERSION,
+    FakeStore,
+    extension_archive,
+    extension_uuid,
+)
+
 
 def test_find():
     store = GnomeExtensionStore()
@@ -26,3 +39,70 @@ def test_shell_version():
     ext = store.find_by_uuid("todo.txt@bart.libert.gmail.com", shell_version="40")
     assert ext is not None
     assert ext.download_url is not None
+
+
+def test_failover(tmp_path):
+    with FakeStore({0: 1}) as fake:
+        # nothing listens on the primary url
+        store = GnomeExtensionStore(
+            url="http://127.0.0.1:9", mirrors=[fake.url], cache=StoreCache(tmp_path)
+        )
+        assert store.endpoints == [fake.url, "http://127.0.0.1:9"]
+        ext = store.find_by_uuid(extension_uuid(0))
+        assert ext is not None and ext.pk == 1
+        assert store.endpoint == fake.url
+
+        # the ranking is cached, failing endpoints are demoted
+        store = GnomeExtensionStore(
+            url=fake.url, mirrors=["http://127.0.0.1:9"], cache=StoreCache(tmp_path)
+        )
+        store.endpoints.reverse()
+        assert store.find_by_pk(1) is not None
+        assert store.endpoints == [fake.url, "http://127.0.0.1:9"]
+
+
+def test_cache_per_store(tmp_path):
+    with FakeStore({0: 1}) as first, FakeStore({0: 2}) as second:
+        for fake, version in ((first, 1), (second, 2), (first, 1)):
+            store = GnomeExtensionStore(url=fake.url, cache=StoreCache(tmp_path))
+            # no request is sent before the ranking is needed
+            assert store.endpoint == fake.url
+            ext = store.find_by_uuid(extension_uuid(0), shell_version=SHELL_VERSION)
+            assert ext is not None and ext.version == version
+        # the answers of a store are not used for another one
+        assert first.requests == 1 and second.requests == 1
+
+
+def test_latency_ranking():
+    with FakeStore({0: 1}, latency=0.2) as slow, FakeStore({0: 1}) as fast:
+        store = GnomeExtensionStore(url=slow.url, mirrors=[fast.url])
+        assert store.endpoints == [fast.url, slow.url]
+        assert store.find_by_uuid(extension_uuid(0)) is not None
+        assert fast.requests == 2
+
+
+def test_download_limit(tmp_path):
+    archive = extension_archive(0, 1)
+    path = f"/download-extension/{extension_uuid(0)}.shell-extension.zip?version_tag=1"
+    with FakeStore({0: 1}) as fake:
+        store = GnomeExtensionStore(url=fake.url, cache=StoreCache(tmp_path))
+        fileobj = BytesIO()
+        digest = store.download(path, fileobj, max_size=len(archive))
+        assert fileobj.getvalue() == archive
+        assert digest == sha256(archive).hexdigest()
+
+        with pytest.raises(ValueError, match="too large"):
+            store.download(path, BytesIO(), max_size=len(archive) - 1)
+        # the size is also checked while downloading when it is not announced
+        fake.content_length = False
+        with pytest.raises(ValueError, match="too large"):
+            store.download(path, BytesIO(), max_size=len(archive) - 1)
+
+
+def test_unwritable_cache(tmp_path):
+    (tmp_path / "file").touch()
+    with FakeStore({0: 1}) as fake:
+        store = GnomeExtensionStore(
+            url=fake.url, cache=StoreCache(tmp_path / "file" / "store")
+        )
+        assert store.find_by_uuid(extension_uuid(0)) is not None
@@ -0,0 +1,69 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gnome_extensions_cli.timings import (
+    process_start,
+    span,
+    start_recording,
+    stop_recording,
+)
+
+from tests.helpers import Desktop, extension_uuid, run_gext
+
+
+def worker(index: int):
+    with span("worker", index=index):
+        time.sleep(0.01)
+
+
+def test_recorder():
+    with span("ignored"):
+        pass
+    recorder = start_recording()
+    try:
+        with span("phase", uuid="foo"):
+            time.sleep(0.01)
+        with span("phase", uuid="bar"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(worker, range(2)))
+    finally:
+        assert stop_recording() is recorder
+    with span("ignored"):
+        pass
+
+    report = {name: (count, total) for name, count, total, _max in recorder.report()}
+    assert list(report) == ["phase", "worker"]
+    assert report["phase"][0] == 2 and report["phase"][1] >= 0.02
+    assert report["worker"][0] == 2
+
+    events = recorder.chrome_trace()["traceEvents"]
+    phases = [e for e in events if e["name"] == "phase"]
+    assert [e["args"] for e in phases] == [{"uuid": "foo"}, {"uuid": "bar"}]
+    assert phases[0]["dur"] >= 10_000
+    assert phases[1]["ts"] >= phases[0]["ts"] + phases[0]["dur"]
+    workers = [e for e in events if e["name"] == "worker"]
+    assert all(e["tid"] != phases[1]["tid"] for e in workers)
+    # threads are named in the trace
+    assert len([e for e in events if e["ph"] == "M"]) >= 2
+
+
+def test_process_start():
+    started = process_start()
+    if started is not None:
+        assert 0 <= time.perf_counter() - started < 3600
+
+
+def test_cli(tmp_path):
+    desktop = Desktop(tmp_path / "desktop")
+    desktop.populate(4, {index: 1 for index in range(4)})
+    trace = tmp_path / "trace.json"
+    process = run_gext(["--timings", "--trace", str(trace), "list"], desktop)
+    assert process.returncode == 0, process.stderr
+    assert "Timings" in process.stderr
+    assert "installed-scan" in process.stderr
+    # only the extensions of the fake desktop are listed
+    assert extension_uuid(0) in process.stdout
+
+    names = {e["name"] for e in json.loads(trace.read_text())["traceEvents"]}
+    assert {"command", "installed-scan", "enabled-list"} <= names